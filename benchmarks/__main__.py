@@ -0,0 +1,72 @@
+import argparse
+import json
+import platform
+import time
+
+from loguru import logger
+
+from benchmarks import crawler, enqueue, mixer
+
+SUITES = {'crawler': crawler, 'enqueue': enqueue, 'mixer': mixer}
+
+
+def run(suites, iterations: int):
+    return {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'results': [
+            result
+            for name in suites
+            for result in SUITES[name].run(iterations)
+        ],
+    }
+
+
+def compare(baseline: dict, current: dict):
+    """Return the median change of every benchmark present in both runs."""
+    baseline_results = {r['name']: r for r in baseline['results']}
+    changes = {}
+    for result in current['results']:
+        previous = baseline_results.get(result['name'])
+        if previous:
+            changes[result['name']] = result['median'] / previous['median'] - 1
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark crawler parsing and the /mi enqueue path.'
+    )
+    parser.add_argument(
+        '--suite', action='append', choices=sorted(SUITES), default=[]
+    )
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument(
+        '--output', default='bench_output.json', help='Write results here.'
+    )
+    parser.add_argument(
+        '--compare', help='Compare against a previous results file.'
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.suite or sorted(SUITES), args.iterations)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for result in results['results']:
+        print(f'{result["name"]:<40} {result["median"] * 1000:10.3f} ms')
+
+    if args.compare:
+        with open(args.compare) as f:
+            changes = compare(json.load(f), results)
+        for name, change in changes.items():
+            print(f'{name:<40} {change:+10.1%}')
+
+    return results
+
+
+if __name__ == '__main__':
+    # Keep the crawler's debug logging out of the report.
+    logger.remove()
+    main()
@@ -0,0 +1,46 @@
+from crawler.cache import TTLCache
+from crawler.instants import InstantsCrawler
+from crawler.parsers import PARSERS
+
+from benchmarks.fixtures import get_fixture
+from benchmarks.harness import bench
+
+
+def run(iterations: int):
+    search_page = get_fixture('search_results.html')
+    details_page = get_fixture('instant_details.html')
+
+    results = []
+    for name, parser in PARSERS.items():
+        crawler = InstantsCrawler(parser=parser())
+        results.append(
+            bench(
+                f'parse_search_results[{name}]',
+                lambda: crawler.parse_search_results(search_page),
+                iterations,
+            )
+        )
+        results.append(
+            bench(
+                f'parse_instant_details[{name}]',
+                lambda: crawler.parse_instant_details(details_page),
+                iterations,
+            )
+        )
+
+    crawler = InstantsCrawler(search_cache=TTLCache())
+    crawler.cache_search_results(
+        'discord',
+        [
+            crawler.get_search_record(instant)
+            for instant in crawler.parse_search_results(search_page)
+        ],
+    )
+    results.append(
+        bench(
+            'get_search_records[cached]',
+            lambda: crawler.get_search_records('Discord'),
+            iterations,
+        )
+    )
+    return results
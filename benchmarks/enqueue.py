@@ -0,0 +1,193 @@
+"""End-to-end /mi benchmark against a local myinstants.com stub.
+
+Discord is replaced by fake interaction and voice objects and ffmpeg by a
+silent source, so the timings cover the bot's own resolution path: the
+crawler round-trips to the stub, parsing and enqueueing.
+"""
+
+import asyncio
+import itertools
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+from aiohttp import web
+
+from bot.client import InstantClient
+from bot.ytdl import YTDLSource
+from crawler.cache import TTLCache
+from crawler.instants import AsyncInstantsCrawler
+from crawler.parsers import get_parser
+
+from benchmarks.fixtures import get_fixture
+from benchmarks.harness import bench_async
+
+
+class SilentAudio(discord.AudioSource):
+    def read(self):
+        return b''
+
+
+class FakeVoiceClient:
+    def __init__(self, channel):
+        self.channel = channel
+        self.played = []
+
+    def play(self, source, *, after=None):
+        self.played.append(source)
+
+    def is_playing(self):
+        return bool(self.played)
+
+    async def disconnect(self):
+        pass
+
+
+class FakeVoiceChannel:
+    async def connect(self):
+        return FakeVoiceClient(self)
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+
+    def typing(self):
+        return FakeTyping()
+
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeResponse:
+    async def defer(self, **kwargs):
+        pass
+
+    async def send_message(self, *args, **kwargs):
+        pass
+
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeInteraction:
+    def __init__(self, guild_id: int, voice_channel: FakeVoiceChannel):
+        self.user = SimpleNamespace(
+            id=guild_id,
+            mention=f'<@{guild_id}>',
+            display_name=f'user-{guild_id}',
+            voice=SimpleNamespace(channel=voice_channel),
+        )
+        self.guild = SimpleNamespace(id=guild_id)
+        self.channel = FakeTextChannel(guild_id)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+async def start_stub():
+    """Serve the fixtures as myinstants.com search and instant pages."""
+    search_page = get_fixture('search_results.html')
+    details_page = get_fixture('instant_details.html')
+
+    async def search(request):
+        return web.Response(body=search_page, content_type='text/html')
+
+    async def instant(request):
+        return web.Response(body=details_page, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/search', search)
+    app.router.add_get('/instant/{slug}/', instant)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f'http://{host}:{port}'
+
+
+class StubServer:
+    """Runs the stub on its own thread and event loop.
+
+    Keeping the server off the benchmark loop means its keep-alive
+    connection handlers are not mistaken for the bot's pending tasks.
+    """
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(start_stub(), self.loop)
+        self.runner, base_url = future.result()
+        return base_url
+
+    def __exit__(self, *args):
+        asyncio.run_coroutine_threadsafe(
+            self.runner.cleanup(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+async def run_flows(base_url: str, iterations: int):
+    bot = SimpleNamespace(loop=asyncio.get_running_loop())
+    voice_channel = FakeVoiceChannel()
+    guild_ids = itertools.count(1)
+    results = []
+
+    flows = (
+        ('cold', None, InstantClient.play, 'discord'),
+        ('warm', TTLCache(), InstantClient.play, 'discord'),
+        ('batch', None, InstantClient.play_batch, 'discord; bruh; discord'),
+    )
+    for name, search_cache, command, argument in flows:
+        client = InstantClient(bot)
+        client.crawler = AsyncInstantsCrawler(
+            search_cache=search_cache, parser=get_parser()
+        )
+        client.crawler.BASE_URL = base_url
+
+        async def enqueue():
+            interaction = FakeInteraction(next(guild_ids), voice_channel)
+            await command.callback(client, interaction, argument)
+
+        results.append(
+            await bench_async(f'mi_enqueue[{name}]', enqueue, iterations)
+        )
+
+        # Let the background details fetches finish, dropping the status
+        # messages still waiting for their rate limit.
+        for state in list(client.voice_states.values()):
+            await state.close()
+        await asyncio.gather(
+            *(asyncio.all_tasks() - {asyncio.current_task()}),
+            return_exceptions=True,
+        )
+        await client.crawler.close()
+
+    return results
+
+
+def run(iterations: int):
+    with StubServer() as base_url, mock.patch.object(
+        YTDLSource,
+        'create_ffmpeg_source',
+        side_effect=lambda *args: SilentAudio(),
+    ):
+        return asyncio.run(run_flows(base_url, iterations))
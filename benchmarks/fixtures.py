@@ -0,0 +1,13 @@
+import os
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests',
+    'fixtures',
+)
+
+
+def get_fixture(file_name: str) -> bytes:
+    """Read a saved myinstants.com page, shared with the test suite."""
+    with open(os.path.join(FIXTURES_DIR, file_name), 'rb') as f:
+        return f.read()
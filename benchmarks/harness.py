@@ -0,0 +1,35 @@
+import statistics
+import time
+
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    return {
+        'name': name,
+        'iterations': len(timings),
+        'min': timings[0],
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max': timings[-1],
+    }
+
+
+def bench(name, func, iterations):
+    """Time `func()` `iterations` times, in seconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(name, timings)
+
+
+async def bench_async(name, func, iterations):
+    """Time `await func()` `iterations` times, in seconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return summarize(name, timings)
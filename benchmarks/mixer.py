@@ -0,0 +1,57 @@
+import array
+
+import discord
+
+from bot.mixer import FRAME_SIZE, Mixer
+from bot.ytdl import YTDLSource
+
+from benchmarks.harness import bench
+
+FRAMES = 50  # One second of audio, a frame must be mixed in under 20 ms.
+
+
+class ToneSource(discord.AudioSource):
+    """Endless synthetic PCM, so only the mixing itself is measured."""
+
+    def __init__(self, amplitude: int):
+        samples = FRAME_SIZE // 2
+        self.frame = array.array(
+            'h', (amplitude * (i % 2 * 2 - 1) for i in range(samples))
+        ).tobytes()
+
+    def read(self):
+        return self.frame
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def run(iterations: int):
+    results = []
+    for tracks in (1, 4, 16):
+        mixer = Mixer(max_tracks=tracks)
+        for track in range(tracks):
+            mixer.add(ToneSource(1000 * (track + 1)), volume=0.5)
+
+        def mix_second(mixer=mixer):
+            for _ in range(FRAMES):
+                mixer.read()
+
+        results.append(bench(f'mix_second[{tracks}]', mix_second, iterations))
+
+    # Loudness gain and volume applied in the same pass as plain volume.
+    sources = {
+        'volume': discord.PCMVolumeTransformer(ToneSource(1000), 0.5),
+        'gain_volume': YTDLSource(ToneSource(1000), data={}, gain=1.5),
+    }
+    for name, source in sources.items():
+
+        def read_second(source=source):
+            for _ in range(FRAMES):
+                source.read()
+
+        results.append(bench(f'read_second[{name}]', read_second, iterations))
+    return results
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import aiohttp
+from loguru import logger
+
+from crawler.singleflight import SingleFlight
+
+
+class AudioCache:
+    """Size-bounded on-disk cache of downloaded instant mp3s.
+
+    Files are addressed by the SHA-256 of their source URL, written to a
+    temporary file and atomically renamed into place, and evicted in least
+    recently used order once the cache grows past `max_bytes`.
+    """
+
+    MAX_BYTES = 256 * 1024 * 1024  # 256 MiB
+    SUFFIX = '.mp3'
+    TEMP_SUFFIX = '.part'
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._downloads = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.rescan()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return self.get_key(url) in self._entries
+
+    @staticmethod
+    def get_key(url: str):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def get_path(self, key: str):
+        return os.path.join(self.directory, f'{key}{self.SUFFIX}')
+
+    def rescan(self):
+        """Rebuild the index from disk, oldest access first."""
+        self._entries.clear()
+        self.size = 0
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(self.TEMP_SUFFIX):
+                # Leftover from a download interrupted by a restart.
+                os.remove(entry.path)
+                continue
+            if entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name[: -len(self.SUFFIX)]] = size
+            self.size += size
+
+        self.evict()
+        logger.debug(
+            f'Audio cache has {len(self._entries)} file(s), {self.size} bytes'
+        )
+
+    def get(self, url: str):
+        """Return the local path for `url` if it is cached, else None."""
+        key = self.get_key(url)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        path = self.get_path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.size -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def put(self, url: str, content: bytes):
+        """Atomically store `content` for `url` and return its path."""
+        key = self.get_key(url)
+        path = self.write(key, content)
+        self.add(key, len(content))
+        return path
+
+    def write(self, key: str, content: bytes):
+        # Safe to run off the event loop: it only touches the filesystem.
+        path = self.get_path(key)
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.directory, suffix=self.TEMP_SUFFIX
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    def add(self, key: str, size: int):
+        self.size -= self._entries.pop(key, 0)
+        self._entries[key] = size
+        self.size += size
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.get_path(key))
+            except FileNotFoundError:
+                pass
+
+    async def download(self, url: str, session: aiohttp.ClientSession):
+        """Download `url` into the cache, sharing concurrent downloads."""
+        path = self.get(url)
+        if path:
+            return path
+
+        return await self._downloads.do(url, self._download, url, session)
+
+    async def _download(self, url, session):
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content = await response.read()
+
+        key = self.get_key(url)
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(None, self.write, key, content)
+        self.add(key, len(content))
+        logger.debug(f'Cached "{url}" at "{path}"')
+        return path
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,119 @@
+import bisect
+import heapq
+from collections import OrderedDict
+
+from crawler.cache import normalize_query
+
+
+def get_trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """Bounded in-memory prefix and trigram index of instant names.
+
+    Prefix lookups bisect a sorted list of normalized names, and queries
+    with no (or too few) prefix matches fall back to substring matching
+    through a trigram index. Once `max_names` is reached the least recently
+    inserted names are dropped.
+    """
+
+    MAX_NAMES = 50_000
+    MAX_CHOICES = 25  # Discord's autocomplete limit
+
+    def __init__(self, max_names: int = MAX_NAMES):
+        self.max_names = max_names
+        self._names = OrderedDict()
+        self._sorted = []
+        self._trigrams = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return normalize_query(name) in self._names
+
+    def add(self, name: str):
+        key = normalize_query(name)
+        if not key:
+            return
+        if key in self._names:
+            self._names.move_to_end(key)
+            return
+
+        self._names[key] = name.strip()
+        bisect.insort(self._sorted, key)
+        for trigram in get_trigrams(key):
+            self._trigrams.setdefault(trigram, set()).add(key)
+
+        while len(self._names) > self.max_names:
+            self._discard(next(iter(self._names)))
+
+    def update(self, names):
+        for name in names:
+            self.add(name)
+
+    def load(self, path: str):
+        """Add every non-empty line of a text file."""
+        with open(path, encoding='utf-8') as f:
+            self.update(line for line in f if line.strip())
+
+    def snapshot(self):
+        """Names from least to most recently added."""
+        return list(self._names.values())
+
+    def restore(self, names):
+        self.update(names)
+
+    def _discard(self, key):
+        del self._names[key]
+        del self._sorted[bisect.bisect_left(self._sorted, key)]
+        for trigram in get_trigrams(key):
+            keys = self._trigrams[trigram]
+            keys.discard(key)
+            if not keys:
+                del self._trigrams[trigram]
+
+    def complete(self, current: str, limit: int = MAX_CHOICES):
+        """Return up to `limit` names matching `current`, prefixes first."""
+        query = normalize_query(current)
+        if not query:
+            recent = reversed(self._names.values())
+            return [name for name, _ in zip(recent, range(limit))]
+
+        matches = []
+        start = bisect.bisect_left(self._sorted, query)
+        for key in self._sorted[start:start + limit]:
+            if not key.startswith(query):
+                break
+            matches.append(key)
+
+        if len(matches) < limit and len(query) >= 3:
+            # Intersect the smallest posting sets first.
+            trigrams = sorted(
+                get_trigrams(query),
+                key=lambda trigram: len(self._trigrams.get(trigram, ())),
+            )
+            candidates = None
+            for trigram in trigrams:
+                keys = self._trigrams.get(trigram)
+                if not keys:
+                    candidates = set()
+                    break
+                candidates = keys if candidates is None else candidates & keys
+                if not candidates:
+                    break
+
+            seen = set(matches)
+            matches.extend(
+                heapq.nsmallest(
+                    limit - len(matches),
+                    (
+                        key
+                        for key in candidates or ()
+                        if key not in seen and query in key
+                    ),
+                )
+            )
+
+        return [self._names[key] for key in matches]
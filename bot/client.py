@@ -1,28 +1,60 @@
 import asyncio
+import functools
+import itertools
 import math
+import time
+from typing import Literal
 
+import aiohttp
 import discord
 from async_timeout import timeout
 from discord import app_commands
 from discord.ext import commands
 from loguru import logger
 
-from bot.exceptions import VoiceError, YTDLError
+from bot import metrics
+from bot.audio_cache import AudioCache
+from bot.autocomplete import NameIndex
+from bot.exceptions import QueueFull, VoiceError, YTDLError
+from bot.ffmpeg import FFmpegScheduler
+from bot.lifecycle import VoiceStateReaper
+from bot.loudness import LoudnessStore
+from bot.messages import MessageScheduler, Notice
+from bot.mixer import Mixer
+from bot.opus_cache import OpusCache
+from bot.prefetch import Prefetcher
+from bot.snapshot import RestoredContext, Snapshotter
 from bot.song import Song, SongQueue
 from bot.ytdl import YTDLSource
-from crawler.instants import InstantsCrawler
+from crawler.cache import TTLCache
+from crawler.index import InstantsIndex
+from crawler.instants import AsyncInstantsCrawler
+from crawler.parsers import get_parser
 
 
 class VoiceState:
-    def __init__(self, bot, context):
+    def __init__(
+        self,
+        bot,
+        context,
+        *,
+        prefetcher: Prefetcher = None,
+        source_factory=YTDLSource.from_info,
+        songs: SongQueue = None,
+        messages: MessageScheduler = None,
+    ):
         self.bot = bot
         self._context = context
         self.timed_out = False
+        self.prefetcher = prefetcher
+        self.messages = messages or MessageScheduler()
+        self.source_factory = source_factory
+        self.last_active = time.monotonic()
 
         self.current = None
         self.voice = None
         self.next = asyncio.Event()
-        self.songs = SongQueue()
+        self.songs = songs if songs is not None else SongQueue()
 
         self._loop = False
         self._volume = 0.5
@@ -30,9 +62,6 @@ class VoiceState:
 
         self.audio_player = bot.loop.create_task(self.audio_player_task())
 
-    def __del__(self):
-        self.audio_player.cancel()
-
     @property
     def loop(self):
         return self._loop
@@ -66,16 +95,102 @@ class VoiceState:
                     self.timed_out = True
                     return
 
-            self.current.source.volume = self._volume
-            self.voice.play(self.current.source, after=self.play_next_song)
-            await self._context.channel.send(embed=self.current.create_embed())
+                metrics.STAGE_SECONDS.observe(
+                    time.perf_counter() - self.current.created_at,
+                    stage='queue_wait',
+                )
+            self.last_active = time.monotonic()
+
+            try:
+                source = await self.current.ensure_source(self.create_source)
+            except (YTDLError, discord.ClientException, OSError) as e:
+                logger.error(f'Could not play "{self.current.url}": {e!r}')
+                self.notify(
+                    Notice('Could not play {}, skipping it.', self.current)
+                )
+                continue
+
+            if self.prefetcher:
+                with metrics.STAGE_SECONDS.time(stage='prefetch_wait'):
+                    await self.prefetcher.ready(self.current)
+            source.volume = self._volume
+            with metrics.STAGE_SECONDS.time(stage='play_start'):
+                self.voice.play(source, after=self.play_next_song)
+            self.prefetch()
+            self.messages.now_playing(
+                self._context.channel, self.current.create_embed()
+            )
+            if self.current.has_pending_details:
+                self.bot.loop.create_task(
+                    self.refresh_now_playing(self.current)
+                )
 
             await self.next.wait()
 
+    async def create_source(self, song):
+        return await self.source_factory(
+            song.data, key=self._context.guild.id, volume=self._volume
+        )
+
+    def overlay(self, source: discord.AudioSource):
+        """Play `source` over the current sound, return False if it can't.
+
+        The current source is wrapped in a `Mixer` the first time, and the
+        next song only starts once every mixed sound has ended.
+        """
+        if not self.voice or not (
+            self.voice.is_playing() or self.voice.is_paused()
+        ):
+            return False
+        mixer = self.voice.source
+        if not isinstance(mixer, Mixer):
+            if not self.voice.encoder:
+                # Only created by `play` for PCM sources, and the mixer
+                # is one even when the current sound is an Opus cache hit.
+                self.voice.encoder = discord.opus.Encoder()
+            mixer = Mixer()
+            mixer.add(self.voice.source)
+            self.voice.source = mixer
+        if not mixer.add(source):
+            return False
+        self.last_active = time.monotonic()
+        return True
+
+    def notify(self, line):
+        """Add a line to the status message of this guild's text channel."""
+        self.messages.notify(self._context.channel, line)
+
+    def refresh_status(self):
+        self.messages.touch(self._context.channel)
+
+    def prefetch(self):
+        """Pre-buffer the next songs in the queue while this one plays."""
+        if self.prefetcher:
+            self.bot.loop.create_task(self.prefetch_next())
+
+    async def prefetch_next(self):
+        # Only the next `depth` songs get a source (and an ffmpeg process)
+        # ahead of time, however long the queue is.
+        songs = list(itertools.islice(self.songs, self.prefetcher.depth))
+        await asyncio.gather(
+            *(song.ensure_source(self.create_source) for song in songs),
+            return_exceptions=True,
+        )
+        # Songs dequeued in the meantime are already being played.
+        queued = [song for song in songs if song in self.songs]
+        self.prefetcher.prefetch(queued, loop=self.bot.loop)
+
+    async def refresh_now_playing(self, song):
+        if await song.wait_for_details() and song is self.current:
+            self.messages.now_playing(
+                self._context.channel, song.create_embed()
+            )
+
     def play_next_song(self, error=None):
         if error:
             raise VoiceError(str(error))
 
+        self.last_active = time.monotonic()
         self.next.set()
 
     def skip(self):
@@ -91,18 +206,219 @@ class VoiceState:
             await self.voice.disconnect()
             self.voice = None
 
+    def snapshot(self):
+        """Return what is needed to resume this guild, or None."""
+        songs = list(self.songs)
+        if self.current is not None and self.voice and self.voice.is_playing():
+            songs.insert(0, self.current)
+        if not songs or not self.voice:
+            return None
+        return {
+            'voice_channel_id': self.voice.channel.id,
+            'text_channel_id': self._context.channel.id,
+            'volume': self._volume,
+            'songs': [song.snapshot() for song in songs],
+        }
+
+    def restore(self, snapshot: dict):
+        """Queue the songs of a snapshot, without resolving them again."""
+        self._volume = snapshot['volume']
+        for song in snapshot['songs']:
+            try:
+                self.songs.put_nowait(Song.restore(song))
+            except QueueFull:
+                break
+
+    async def close(self):
+        """Cancel the player task and release everything the state holds."""
+        self.audio_player.cancel()
+        self.current = None
+        self.messages.discard(self._context.channel)
+        await self.stop()
+
 
 class InstantClient(commands.Cog):
-    crawler = InstantsCrawler()
+    crawler = AsyncInstantsCrawler(
+        # Expired results are still served for an hour if myinstants is down.
+        search_cache=TTLCache(grace=60 * 60),
+        parser=get_parser(),
+    )
 
-    def __init__(self, bot):
+    MAX_BATCH = 5
+    BATCH_CONCURRENCY = 3
+
+    def __init__(
+        self,
+        bot,
+        *,
+        audio_cache: AudioCache = None,
+        opus_cache: OpusCache = None,
+        index: InstantsIndex = None,
+        names: NameIndex = None,
+        prefetcher: Prefetcher = None,
+        scheduler: FFmpegScheduler = None,
+        reaper: VoiceStateReaper = None,
+        queue_factory=SongQueue,
+        snapshotter: Snapshotter = None,
+        loudness: LoudnessStore = None,
+        messages: MessageScheduler = None,
+    ):
         self.bot = bot
         self.voice_states = {}
+        self.snapshotter = snapshotter
+        self.pending_restores = {}
+        self.reaper = reaper or VoiceStateReaper()
+        self.queue_factory = queue_factory
+        self.audio_cache = audio_cache
+        self.opus_cache = opus_cache
+        self.index = index
+        self.loudness = loudness or LoudnessStore(index)
+        self.messages = messages or MessageScheduler()
+        self.names = names if names is not None else NameIndex()
+        self.prefetcher = prefetcher
+        self.scheduler = scheduler
+
+        metrics.VOICE_STATES.set_function(lambda: len(self.voice_states))
+        metrics.QUEUED_SONGS.set_function(
+            lambda: sum(
+                len(state.songs) for state in self.voice_states.values()
+            )
+        )
+        metrics.VOICE_STATE_BYTES.set_function(
+            lambda: self.reaper.get_memory_size(self.voice_states)
+        )
+        metrics.CACHE_EVENTS.set_function(self.collect_cache_events)
+        if scheduler:
+            metrics.FFMPEG_PROCESSES.set_function(
+                lambda: {
+                    (state,): scheduler.stats[state]
+                    for state in ('running', 'waiting', 'warm')
+                }
+            )
+
+    def collect_cache_events(self):
+        caches = {
+            'search': self.crawler.search_cache,
+            'inflight': self.crawler.inflight,
+            'audio': self.audio_cache,
+            'opus': self.opus_cache,
+            'loudness': self.loudness,
+            'upstream': self.crawler,
+        }
+        events = {
+            (name, event): value
+            for name, cache in caches.items()
+            if cache is not None
+            for event, value in cache.stats.items()
+        }
+        if self.index is not None:
+            events['index', 'hits'] = self.index.hits
+            events['index', 'misses'] = self.index.misses
+        if self.prefetcher:
+            events['prefetch', 'prefetched'] = self.prefetcher.prefetched
+            events['prefetch', 'bytes'] = self.prefetcher.buffered_bytes
+        return events
+
+    async def cog_load(self):
+        self.reaper.start(self.voice_states)
+        if self.scheduler:
+            self.scheduler.start()
+        if self.snapshotter:
+            self.load_snapshot()
+            self.snapshotter.start(self)
+
+    async def cog_unload(self):
+        self.reaper.stop()
+        if self.snapshotter:
+            self.snapshotter.stop()
+            try:
+                self.snapshotter.save(self)
+            except OSError as e:
+                logger.warning(f'Could not save snapshot: {e!r}')
+        for state in list(self.voice_states.values()):
+            await state.close()
+        self.voice_states.clear()
+        await self.crawler.close()
+        if self.scheduler:
+            self.scheduler.close()
+
+    def load_snapshot(self):
+        snapshot = self.snapshotter.load()
+        if not snapshot:
+            return
+        self.names.restore(snapshot['names'])
+        if self.opus_cache:
+            self.opus_cache.restore(snapshot['opus_plays'])
+        if self.crawler.search_cache is not None:
+            self.crawler.search_cache.restore(
+                snapshot.get('search_results', []),
+                age=time.time() - snapshot['saved_at'],
+            )
+        self.pending_restores = {
+            int(guild_id): guild
+            for guild_id, guild in snapshot['guilds'].items()
+        }
+        logger.info(
+            f'Loaded snapshot with {len(self.pending_restores)} queue(s)'
+        )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.pending_restores:
+            self.bot.loop.create_task(self.restore_voice_states())
+
+    async def restore_voice_states(self, concurrency: int = 4):
+        """Reconnect the guilds of the last snapshot, a few at a time."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def restore(guild_id):
+            async with semaphore:
+                await self.restore_voice_state(guild_id)
+
+        await asyncio.gather(
+            *(restore(guild_id) for guild_id in list(self.pending_restores))
+        )
+
+    async def restore_voice_state(self, guild_id: int):
+        # Popped first: a /mi in that guild may have restored it already.
+        snapshot = self.pending_restores.pop(guild_id, None)
+        guild = self.bot.get_guild(guild_id)
+        if snapshot is None or guild is None:
+            return
+
+        voice_channel = guild.get_channel(snapshot['voice_channel_id'])
+        text_channel = guild.get_channel(snapshot['text_channel_id'])
+        if voice_channel is None or text_channel is None:
+            return
+
+        state = self.get_voice_state(RestoredContext(guild, text_channel))
+        if not state.voice:
+            try:
+                state.voice = await voice_channel.connect()
+            except (discord.ClientException, asyncio.TimeoutError) as e:
+                logger.warning(f'Could not restore guild {guild_id}: {e!r}')
+                self.voice_states.pop(guild_id, None)
+                await state.close()
+                return
+        state.restore(snapshot)
 
     def get_voice_state(self, context):
         state = self.voice_states.get(context.guild.id)
         if not state or state.timed_out:
-            state = VoiceState(self.bot, context)
+            state = VoiceState(
+                self.bot,
+                context,
+                prefetcher=self.prefetcher,
+                source_factory=functools.partial(
+                    YTDLSource.from_info,
+                    audio_cache=self.audio_cache,
+                    opus_cache=self.opus_cache,
+                    scheduler=self.scheduler,
+                    loudness=self.loudness,
+                ),
+                songs=self.queue_factory(),
+                messages=self.messages,
+            )
             self.voice_states[context.guild.id] = state
         return state
 
@@ -150,8 +466,8 @@ class InstantClient(commands.Cog):
             )
 
         await interaction.response.send_message('Leaving current channel.')
-        await voice_state.stop()
         del self.voice_states[interaction.guild.id]
+        await voice_state.close()
 
     @app_commands.command(name='volume', description='Set volume sound.')
     async def volume(self, interaction: discord.Interaction, volume: int):
@@ -206,7 +522,7 @@ class InstantClient(commands.Cog):
             )
 
         voter = interaction.user
-        if voter == voice_state.current.requester:
+        if voter.id == voice_state.current.requester_id:
             await interaction.response.send_message('Skipping current sound.')
             voice_state.skip()
 
@@ -240,7 +556,7 @@ class InstantClient(commands.Cog):
 
         queue = ''
         for i, song in enumerate(voice_state.songs[start:end], start=start):
-            queue += '`{0}.` [**{1.source.title}**]({1.source.url})\n'.format(
+            queue += '`{0}.` [**{1.title}**]({1.url})\n'.format(
                 i + 1, song
             )
 
@@ -270,6 +586,21 @@ class InstantClient(commands.Cog):
             f'Removed song at position {index}.'
         )
 
+    @app_commands.command(name='move', description='Move a queued sound.')
+    async def move(
+        self, interaction: discord.Interaction, index: int, position: int
+    ):
+        voice_state = self.get_voice_state(interaction)
+        if not 1 <= index <= len(voice_state.songs):
+            return await interaction.response.send_message(
+                'There is no sound at this position.'
+            )
+
+        voice_state.songs.move(index - 1, max(position, 1) - 1)
+        await interaction.response.send_message(
+            f'Moved song at position {index} to position {position}.'
+        )
+
     @app_commands.command(
         name='loop', description='Loop last myinstants sound.'
     )
@@ -292,43 +623,357 @@ class InstantClient(commands.Cog):
         )
 
     @app_commands.command(name='mi', description='Play myinstants sound.')
-    async def play(self, interaction: discord.Interaction, search: str):
+    @app_commands.describe(
+        mode='Queue the sound, or play it over the current one.'
+    )
+    async def play(
+        self,
+        interaction: discord.Interaction,
+        search: str,
+        mode: Literal['enqueue', 'overlay'] = 'enqueue',
+    ):
+        voice_state = await self.prepare_voice_state(interaction)
+        if voice_state is None:
+            return
+
+        async with interaction.channel.typing():
+            try:
+                song, mp3_link = await self.resolve_song(interaction, search)
+                if mode == 'overlay' and await self.overlay(
+                    voice_state, song
+                ):
+                    voice_state.notify(
+                        Notice(
+                            '{} played {} over the current sound.',
+                            interaction.user.display_name,
+                            song,
+                        )
+                    )
+                    message = await interaction.followup.send(
+                        f'Playing {song} over the current sound.',
+                        ephemeral=True,
+                        wait=True,
+                    )
+                    if song.has_pending_details:
+                        self.bot.loop.create_task(
+                            self.refresh_enqueued(
+                                voice_state,
+                                [song],
+                                message,
+                                lambda: (
+                                    f'Playing {song} over the current sound.'
+                                ),
+                            )
+                        )
+                    return
+                self.enqueue(voice_state, song, mp3_link)
+            except YTDLError as e:
+                metrics.REQUESTS.inc(outcome='not_found')
+                await interaction.followup.send(
+                    'An error occurred while processing this request. '
+                    f'Details: {str(e)}',
+                    ephemeral=True,
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f'Myinstants request failed: {e!r}')
+                metrics.REQUESTS.inc(outcome='upstream_error')
+                await interaction.followup.send(
+                    'Myinstants is not responding right now, '
+                    'please try again later.',
+                    ephemeral=True,
+                )
+            except QueueFull as e:
+                # Filled up by concurrent requests since the check.
+                await interaction.followup.send(str(e), ephemeral=True)
+            else:
+                voice_state.notify(
+                    Notice(
+                        '{} enqueued {}.', interaction.user.display_name, song
+                    )
+                )
+                message = await interaction.followup.send(
+                    f'Enqueued {song}.', ephemeral=True, wait=True
+                )
+                if song.has_pending_details:
+                    self.bot.loop.create_task(
+                        self.refresh_enqueued(
+                            voice_state,
+                            [song],
+                            message,
+                            lambda: f'Enqueued {song}.',
+                        )
+                    )
+
+    @app_commands.command(
+        name='mibatch',
+        description='Play several myinstants sounds, separated by ";".',
+    )
+    async def play_batch(
+        self, interaction: discord.Interaction, searches: str
+    ):
+        queries = [query.strip() for query in searches.split(';')]
+        queries = [query for query in queries if query]
+        if not queries:
+            return await interaction.response.send_message(
+                'Separate the sounds to play with ";".', ephemeral=True
+            )
+        if len(queries) > self.MAX_BATCH:
+            return await interaction.response.send_message(
+                f'You can play up to {self.MAX_BATCH} sounds at once.',
+                ephemeral=True,
+            )
+
+        voice_state = await self.prepare_voice_state(interaction)
+        if voice_state is None:
+            return
+
+        semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
+
+        async def resolve(query):
+            async with semaphore:
+                return await self.resolve_song(interaction, query)
+
+        async with interaction.channel.typing():
+            results = await asyncio.gather(
+                *(resolve(query) for query in queries),
+                return_exceptions=True,
+            )
+
+            # Enqueued in the order given, whatever order they resolved in.
+            lines = []
+            songs = []
+            for position, (query, result) in enumerate(
+                zip(queries, results), start=1
+            ):
+                song = error = None
+                try:
+                    if isinstance(result, BaseException):
+                        raise result
+                    song, mp3_link = result
+                    self.enqueue(voice_state, song, mp3_link)
+                except YTDLError:
+                    metrics.REQUESTS.inc(outcome='not_found')
+                    song, error = None, f'Nothing found for `{query}`.'
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f'Myinstants request failed: {e!r}')
+                    metrics.REQUESTS.inc(outcome='upstream_error')
+                    song, error = None, f'Myinstants did not answer `{query}`.'
+                except QueueFull as e:
+                    song, error = None, str(e)
+                except Exception as e:
+                    # One broken sound must not lose the rest of the batch.
+                    logger.error(f'Could not enqueue "{query}": {e!r}')
+                    metrics.REQUESTS.inc(outcome='error')
+                    song, error = None, f'Could not play `{query}`.'
+                else:
+                    songs.append(song)
+                    voice_state.notify(
+                        Notice(
+                            '{} enqueued {}.',
+                            interaction.user.display_name,
+                            song,
+                        )
+                    )
+                lines.append((position, song, error))
+
+            message = await interaction.followup.send(
+                self.format_batch(lines), ephemeral=True, wait=True
+            )
+        if any(song.has_pending_details for song in songs):
+            self.bot.loop.create_task(
+                self.refresh_enqueued(
+                    voice_state,
+                    songs,
+                    message,
+                    functools.partial(self.format_batch, lines),
+                )
+            )
+
+    @staticmethod
+    def format_batch(lines):
+        return '\n'.join(
+            f'`{position}.` '
+            + (f'Enqueued {song}.' if song is not None else error)
+            for position, song, error in lines
+        )
+
+    async def prepare_voice_state(self, interaction: discord.Interaction):
+        """Check a /mi request and connect, return None if it was refused."""
         voice_state = self.get_voice_state(interaction)
 
         if not interaction.user.voice or not interaction.user.voice.channel:
-            return await interaction.response.send_message(
+            await interaction.response.send_message(
                 'You are not connected to any voice channel.', ephemeral=True
             )
+            return None
+
+        try:
+            voice_state.songs.check_capacity(interaction.user.id)
+        except QueueFull as e:
+            metrics.REQUESTS.inc(outcome='queue_full')
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return None
 
         if not voice_state.voice:
             channel = interaction.user.voice.channel
             voice_state.voice = await channel.connect()
+            snapshot = self.pending_restores.pop(interaction.guild.id, None)
+            if snapshot:
+                voice_state.restore(snapshot)
+
+        # Replies only go to the requester, the channel sees the status.
+        await interaction.response.defer(ephemeral=True)
+        return voice_state
+
+    async def resolve_song(self, interaction: discord.Interaction, search):
+        """Resolve `search` into a song ready to queue, and its mp3 link."""
+        with metrics.STAGE_SECONDS.time(stage='resolve'):
+            mp3_link, data, details = await self.resolve_instant(search)
+        try:
+            with metrics.STAGE_SECONDS.time(stage='source'):
+                info = await YTDLSource.get_info(
+                    mp3_link, data, loop=self.bot.loop
+                )
+        except BaseException:
+            if details:
+                details.cancel()
+            raise
+        song = Song(info, requester_id=interaction.user.id, details=details)
+        return song, mp3_link
+
+    async def overlay(self, voice_state: VoiceState, song: Song):
+        """Mix `song` into the current playback, or return False to queue it.
+
+        Falls back to the queue when nothing is playing or the mixer is
+        full, in which case the song keeps the source created for it.
+        """
+        if not voice_state.voice or not voice_state.voice.is_playing():
+            return False
+        try:
+            source = await song.ensure_source(voice_state.create_source)
+        except (YTDLError, discord.ClientException, OSError) as e:
+            logger.error(f'Could not overlay "{song.url}": {e!r}')
+            return False
+        if not voice_state.overlay(source):
+            return False
+        metrics.REQUESTS.inc(outcome='overlaid')
+        return True
 
-        await interaction.response.defer()
+    def enqueue(self, voice_state: VoiceState, song: Song, mp3_link: str):
+        """Queue `song` and start the background work it triggers."""
+        try:
+            voice_state.songs.put_nowait(song)
+        except QueueFull:
+            if song.details:
+                song.details.cancel()
+            metrics.REQUESTS.inc(outcome='queue_full')
+            raise
+
+        metrics.REQUESTS.inc(outcome='enqueued')
+        if voice_state.is_playing:
+            voice_state.prefetch()
+        if (
+            self.audio_cache is not None
+            and mp3_link not in self.audio_cache
+        ):
+            self.bot.loop.create_task(self.cache_audio(mp3_link))
+        if self.opus_cache:
+            # Encoded with the sound's loudness gain baked in, if known.
+            volume = voice_state.volume * (self.loudness.get(mp3_link) or 1)
+            if self.opus_cache.record_play(mp3_link, volume):
+                self.bot.loop.create_task(self.cache_opus(mp3_link, volume))
+
+    async def resolve_instant(self, search):
+        """Find the best match for `search`, preferring the local index.
+
+        Returns the mp3 link, the instant data known right away and, when
+        the details are not known yet, a task fetching them. The details
+        page only feeds the embeds, so it is fetched concurrently and the
+        audio starts without it.
+        """
+        record = None
+        if self.index is not None:
+            record = self.index.get_single_search_result(search)
+        if record:
+            self.names.add(record['name'])
+            data = {'title': record['name']}
+            details = self.index.get_details(record)
+            if details:
+                return record['mp3_link'], {**data, **details}, None
+            return (
+                record['mp3_link'],
+                data,
+                self.bot.loop.create_task(
+                    self.fetch_instant_details(record['instant_link'])
+                ),
+            )
 
-        async with interaction.channel.typing():
-            try:
-                instant = self.crawler.get_single_search_result(search)
-                if not instant:
-                    raise YTDLError(
-                        f"Couldn't retrieve any matches for `{search}`"
-                    )
+        records = await self.crawler.get_search_records(search)
+        if not records:
+            raise YTDLError(f"Couldn't retrieve any matches for `{search}`")
 
-                mp3_link = self.crawler.get_instant_mp3_link(instant)
-                instant_details = self.crawler.get_instant_details(instant)
-                source = await YTDLSource.from_url(
-                    interaction, mp3_link, instant_details, loop=self.bot.loop
-                )
-            except YTDLError as e:
-                await interaction.followup.send(
-                    'An error occurred while processing this request. '
-                    f'Details: {str(e)}',
-                    ephemeral=True,
-                )
-            else:
-                song = Song(source)
-                await voice_state.songs.put(song)
-                await interaction.followup.send(f'Enqueued {str(source)}.')
+        record = records[0]
+        self.names.update(result['name'] for result in records)
+
+        return (
+            record['mp3_link'],
+            {'title': record['name']},
+            self.bot.loop.create_task(
+                self.fetch_instant_details(record['instant_link'])
+            ),
+        )
+
+    async def fetch_instant_details(self, instant_link):
+        with metrics.STAGE_SECONDS.time(stage='details'):
+            return await self.crawler.fetch_instant_details(instant_link)
+
+    async def cache_audio(self, url):
+        try:
+            await self.audio_cache.download(url, self.crawler.get_session())
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.warning(f'Could not cache "{url}": {e!r}')
+
+    async def cache_opus(self, url, volume):
+        path = (
+            self.audio_cache.get(url)
+            if self.audio_cache is not None
+            else None
+        )
+        try:
+            await self.opus_cache.encode(
+                path or url, url, volume, scheduler=self.scheduler
+            )
+        except (discord.ClientException, OSError) as e:
+            logger.warning(f'Could not encode "{url}": {e!r}')
+
+    async def refresh_enqueued(
+        self, voice_state: VoiceState, songs, message, render
+    ):
+        """Show the details of `songs` once they arrive.
+
+        Both the status and the requester's reply `message` are updated,
+        the latter with the content returned by `render()`.
+        """
+        merged = await asyncio.gather(
+            *(song.wait_for_details() for song in songs)
+        )
+        if not any(merged):
+            return
+        voice_state.refresh_status()
+        try:
+            await message.edit(content=render())
+        except discord.HTTPException as e:
+            # Replies can only be edited for 15 minutes.
+            logger.debug(f'Could not update reply: {e!r}')
+
+    @play.autocomplete('search')
+    async def play_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ):
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in self.names.complete(current)
+        ]
 
     @app_commands.command(
         name='help', description='List and describe all available commands.'
@@ -338,6 +983,14 @@ class InstantClient(commands.Cog):
             ('/leave', 'Disconnect the bot from the voice channel.'),
             ('/now', 'Shows the current sound playing.'),
             ('/mi <search>', 'Play a sound from MyInstants.'),
+            (
+                '/mi <search> overlay',
+                'Play a sound over the current one instead of queueing it.',
+            ),
+            (
+                '/mibatch <search; search...>',
+                f'Play up to {self.MAX_BATCH} sounds at once.',
+            ),
             ('/pause', 'Pause the current playback.'),
             ('/resume', 'Resume playback.'),
             ('/skip', 'Skip the current track.'),
@@ -347,6 +1000,10 @@ class InstantClient(commands.Cog):
                 '/remove <index>',
                 'Remove a track from the queue by its position.',
             ),
+            (
+                '/move <index> <position>',
+                'Move a track to another position in the queue.',
+            ),
             ('/loop', 'Toggle looping of the current track.'),
             ('/volume <value>', 'Set the playback volume (0-100).'),
         ]
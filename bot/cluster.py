@@ -0,0 +1,102 @@
+import multiprocessing
+import time
+
+import requests
+from loguru import logger
+
+from bot import run
+
+GATEWAY_URL = 'https://discord.com/api/v10/gateway/bot'
+
+
+def get_shard_ranges(shard_count: int, clusters: int):
+    """Split shard ids into `clusters` contiguous, balanced ranges."""
+    if not 0 < clusters <= shard_count:
+        raise ValueError(
+            f'Cannot split {shard_count} shard(s) into {clusters} cluster(s)'
+        )
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for cluster in range(clusters):
+        end = start + size + (cluster < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def get_recommended_shard_count(bot_token: str, timeout: float = 10):
+    response = requests.get(
+        GATEWAY_URL,
+        headers={'Authorization': f'Bot {bot_token}'},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()['shards']
+
+
+class ClusterLauncher:
+    """Runs a sharded bot as several processes, each owning a shard range.
+
+    Every process is a full bot with its own `InstantClient`, voice states
+    and caches, identified as `cluster-<n>` in its logs and metrics. A
+    cluster that exits is restarted after `RESTART_DELAY` seconds.
+    """
+
+    RESTART_DELAY = 5
+
+    def __init__(self, bot_token: str, shard_ranges, shard_count: int):
+        self.bot_token = bot_token
+        self.shard_ranges = shard_ranges
+        self.shard_count = shard_count
+        self.processes = {}
+        # Clusters must not inherit the parent's event loop or sockets.
+        self._context = multiprocessing.get_context('spawn')
+
+    def start(self, cluster: int):
+        process = self._context.Process(
+            target=run.run,
+            args=(self.bot_token,),
+            kwargs={
+                'cluster': cluster,
+                'shard_count': self.shard_count,
+                'shard_ids': self.shard_ranges[cluster],
+            },
+            name=f'cluster-{cluster}',
+        )
+        process.start()
+        self.processes[cluster] = process
+        logger.info(
+            f'Started cluster-{cluster} (pid {process.pid}) with shards '
+            f'{self.shard_ranges[cluster]}'
+        )
+
+    def supervise(self):
+        for cluster in range(len(self.shard_ranges)):
+            self.start(cluster)
+        try:
+            while True:
+                time.sleep(self.RESTART_DELAY)
+                for cluster, process in list(self.processes.items()):
+                    if not process.is_alive():
+                        logger.warning(
+                            f'cluster-{cluster} exited with code '
+                            f'{process.exitcode}, restarting'
+                        )
+                        self.start(cluster)
+        finally:
+            self.stop()
+
+    def stop(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join()
+
+
+def launch(bot_token: str, *, clusters: int, shard_count: int = None):
+    if shard_count is None:
+        shard_count = max(get_recommended_shard_count(bot_token), clusters)
+    shard_ranges = get_shard_ranges(shard_count, clusters)
+    ClusterLauncher(bot_token, shard_ranges, shard_count).supervise()
@@ -8,3 +8,7 @@ class YTDLError(Exception):
 
 class MissingBotToken(Exception):
     pass
+
+
+class QueueFull(Exception):
+    pass
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+import discord
+from loguru import logger
+
+
+class PendingInput:
+    """Stdin of a warm ffmpeg process, blocking until a file is attached."""
+
+    def __init__(self):
+        self._file = None
+        self._ready = threading.Event()
+
+    def attach(self, path: str):
+        self._file = open(path, 'rb')
+        self._ready.set()
+
+    def read(self, size: int):
+        self._ready.wait()
+        if self._file is None:
+            return b''
+        data = self._file.read(size)
+        if not data:
+            self._file.close()
+        return data
+
+    def close(self):
+        # Unblocks the writer thread, which then closes ffmpeg's stdin.
+        self._ready.set()
+
+
+class WarmFFmpegPCMAudio(discord.FFmpegPCMAudio):
+    """ffmpeg process spawned ahead of time, reading its input from stdin."""
+
+    def __init__(self, options: dict):
+        self.input = PendingInput()
+        super().__init__(self.input, pipe=True, **options)
+
+    def attach(self, path: str):
+        self.input.attach(path)
+
+    def cleanup(self):
+        self.input.close()
+        super().cleanup()
+
+
+class FFmpegScheduler:
+    """Caps the number of running ffmpeg processes across every guild.
+
+    A slot is taken before a transcoder is spawned and given back when its
+    source is cleaned up. Once `max_processes` are running, new requests
+    wait in per-guild queues that are served round-robin, so one guild
+    spamming /mi cannot starve the others.
+
+    With `warm_processes` set, that many idle ffmpeg processes are kept
+    spawned and reading from stdin, and local files (audio cache hits) are
+    piped into one of them instead of paying for a new process.
+    """
+
+    MAX_PROCESSES = 32
+    WARM_PROCESSES = 0
+    WARM_OPTIONS = {'options': '-vn'}
+
+    def __init__(
+        self,
+        max_processes: int = MAX_PROCESSES,
+        *,
+        warm_processes: int = WARM_PROCESSES,
+    ):
+        self.max_processes = max_processes
+        self.warm_processes = warm_processes
+        self.running = 0
+        self._waiters = OrderedDict()
+        self._warm = deque()
+        self._warming = 0
+        self._loop = None
+
+        self.acquired = 0
+        self.queued = 0
+        self.warm_hits = 0
+
+    @property
+    def waiting(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    @property
+    def stats(self):
+        return {
+            'running': self.running,
+            'waiting': self.waiting,
+            'warm': len(self._warm),
+            'acquired': self.acquired,
+            'queued': self.queued,
+            'warm_hits': self.warm_hits,
+        }
+
+    async def acquire(self, key):
+        """Wait for a free slot, queued fairly behind other `key`s."""
+        self._loop = asyncio.get_running_loop()
+        self.acquired += 1
+        if self.running < self.max_processes and not self._waiters:
+            self.running += 1
+            return
+
+        self.queued += 1
+        future = self._loop.create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation.
+                self.release()
+            else:
+                self._discard_waiter(key, future)
+            raise
+
+    def _discard_waiter(self, key, future):
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[key]
+
+    def release(self):
+        """Hand the slot to the next waiting guild, or free it."""
+        while self._waiters:
+            key, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def release_threadsafe(self):
+        """Release from any thread, such as discord's audio player."""
+        if self._loop is None:
+            self.release()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self.release)
+        except RuntimeError:
+            # The loop is closed, nothing is waiting for the slot anymore.
+            pass
+
+    def take_warm(self, path: str):
+        """Pipe a local file into a warm process, if one is available."""
+        while self._warm:
+            audio = self._warm.popleft()
+            if audio._process.poll() is None:
+                audio.attach(path)
+                self.warm_hits += 1
+                return audio
+            audio.cleanup()
+        return None
+
+    def refill(self):
+        """Spawn warm processes in the background up to `warm_processes`."""
+        if self._loop is None:
+            return
+        missing = self.warm_processes - len(self._warm) - self._warming
+        for _ in range(max(missing, 0)):
+            self._warming += 1
+            future = self._loop.run_in_executor(None, self._spawn_warm)
+            future.add_done_callback(self._add_warm)
+
+    def _spawn_warm(self):
+        return WarmFFmpegPCMAudio(self.WARM_OPTIONS)
+
+    def _add_warm(self, future):
+        self._warming -= 1
+        if future.cancelled():
+            return
+        if future.exception():
+            logger.warning(
+                f'Could not spawn a warm ffmpeg: {future.exception()!r}'
+            )
+            return
+        audio = future.result()
+        if len(self._warm) >= self.warm_processes:
+            audio.cleanup()  # Closed while it was spawning
+            return
+        self._warm.append(audio)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.refill()
+
+    def close(self):
+        self.warm_processes = 0
+        while self._warm:
+            self._warm.popleft().cleanup()
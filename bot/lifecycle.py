@@ -0,0 +1,108 @@
+import asyncio
+import sys
+import time
+
+from loguru import logger
+
+from bot import metrics
+
+
+def get_shallow_size(obj):
+    """Size of an object and of its attribute dict, if it has one."""
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+    return size
+
+
+class VoiceStateReaper:
+    """Evicts idle or disconnected guild voice states on a schedule.
+
+    Every `interval` seconds, states whose player timed out, whose voice
+    client got disconnected, or that have had nothing to play for
+    `max_idle` seconds are removed from the cog's voice states and closed,
+    which cancels their player task, drops their queue and disconnects.
+    """
+
+    INTERVAL = 60
+    MAX_IDLE = 5 * 60  # 5 minutes
+
+    def __init__(
+        self,
+        *,
+        interval: float = INTERVAL,
+        max_idle: float = MAX_IDLE,
+        clock=None,
+    ):
+        self.interval = interval
+        self.max_idle = max_idle
+        self._clock = clock or time.monotonic
+        self._task = None
+
+        self.reaped = {'timed_out': 0, 'disconnected': 0, 'idle': 0}
+
+    @property
+    def stats(self):
+        return dict(self.reaped)
+
+    def get_reason(self, state, now):
+        """Return why `state` should be evicted, or None to keep it."""
+        if state.timed_out:
+            return 'timed_out'
+        if state.voice is not None and not state.voice.is_connected():
+            return 'disconnected'
+        # `is_playing` stays set after a song ends, ask the voice client.
+        playing = state.voice is not None and state.voice.is_playing()
+        if (
+            not playing
+            and not len(state.songs)
+            and now - state.last_active > self.max_idle
+        ):
+            return 'idle'
+        return None
+
+    async def reap(self, voice_states: dict):
+        now = self._clock()
+        reaped = 0
+        for guild_id, state in list(voice_states.items()):
+            reason = self.get_reason(state, now)
+            if reason is None:
+                continue
+            # The state may have been replaced while a previous one closed.
+            if voice_states.get(guild_id) is state:
+                del voice_states[guild_id]
+            self.reaped[reason] += 1
+            reaped += 1
+            metrics.REAPED_VOICE_STATES.inc(reason=reason)
+            try:
+                await state.close()
+            except Exception as e:
+                logger.warning(f'Could not close voice state: {e!r}')
+        return reaped
+
+    async def run(self, voice_states: dict):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reap(voice_states)
+
+    def start(self, voice_states: dict):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self.run(voice_states)
+            )
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def get_memory_size(voice_states: dict):
+        """Rough shallow size in bytes of every live state and its queue."""
+        size = 0
+        for state in voice_states.values():
+            size += get_shallow_size(state)
+            for song in state.songs:
+                size += get_shallow_size(song) + sys.getsizeof(song.data)
+        return size
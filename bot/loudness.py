@@ -0,0 +1,135 @@
+import asyncio
+import audioop
+import functools
+import math
+import time
+from collections import OrderedDict
+
+from crawler.index import InstantsIndex
+
+
+class LoudnessMeter:
+    """Measures the RMS loudness of a sound from the PCM frames it plays.
+
+    Near-silent frames are left out, so the silence instants are often
+    padded with does not make them look quieter than they sound.
+    """
+
+    SILENCE = 64
+    MIN_FRAMES = 10  # 200 ms of sound
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.energy = 0
+        self.frames = 0
+        self._finished = False
+
+    def add(self, frame: bytes):
+        if not frame:
+            self.finish()
+            return
+        rms = audioop.rms(frame, 2)
+        if rms >= self.SILENCE:
+            self.energy += rms * rms
+            self.frames += 1
+
+    @property
+    def rms(self):
+        return math.sqrt(self.energy / self.frames) if self.frames else 0
+
+    def finish(self):
+        """Report the loudness once, if enough of the sound was heard."""
+        if self._finished:
+            return
+        self._finished = True
+        if self.frames >= self.MIN_FRAMES:
+            self.callback(self.rms)
+
+
+class LoudnessStore:
+    """Per-sound gains that bring every instant to the same loudness.
+
+    A sound's gain is measured from the frames it plays the first time,
+    then kept in memory and, when there is one, in the index, so later
+    plays apply it along with the user volume at no extra cost.
+    """
+
+    TARGET_RMS = 3000  # About -21 dBFS
+    MIN_GAIN = 0.25
+    MAX_GAIN = 4.0
+    MAX_ENTRIES = 4096
+
+    def __init__(
+        self,
+        index: InstantsIndex = None,
+        *,
+        target_rms: float = TARGET_RMS,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.index = index
+        self.target_rms = target_rms
+        self.max_entries = max_entries
+        self._gains = OrderedDict()
+        self._loop = None
+
+        self.hits = 0
+        self.misses = 0
+        self.measured = 0
+
+    def get_gain(self, rms: float):
+        if not rms:
+            return 1.0
+        gain = self.target_rms / rms
+        return min(max(gain, self.MIN_GAIN), self.MAX_GAIN)
+
+    def get(self, url: str):
+        """Return the gain of `url`, or None if it was never measured."""
+        gain = self._gains.get(url)
+        if gain is None and self.index is not None:
+            gain = self.index.get_gain(url)
+            if gain is not None:
+                self.remember(url, gain)
+        if gain is None:
+            self.misses += 1
+            return None
+        self._gains.move_to_end(url)
+        self.hits += 1
+        return gain
+
+    def remember(self, url: str, gain: float):
+        self._gains[url] = gain
+        self._gains.move_to_end(url)
+        while len(self._gains) > self.max_entries:
+            self._gains.popitem(last=False)
+
+    def record(self, url: str, rms: float):
+        gain = self.get_gain(rms)
+        self.remember(url, gain)
+        if self.index is not None:
+            self.index.set_gain(url, gain, measured_at=time.time())
+        self.measured += 1
+        return gain
+
+    def record_threadsafe(self, url: str, rms: float):
+        """Record from any thread, such as discord's audio player."""
+        if self._loop is None:
+            self.record(url, rms)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self.record, url, rms)
+        except RuntimeError:
+            # The loop is closed, the measurement is lost.
+            pass
+
+    def create_meter(self, url: str):
+        self._loop = asyncio.get_running_loop()
+        return LoudnessMeter(functools.partial(self.record_threadsafe, url))
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._gains),
+            'hits': self.hits,
+            'misses': self.misses,
+            'measured': self.measured,
+        }
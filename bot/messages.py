@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import deque
+
+import discord
+from loguru import logger
+
+from bot import metrics
+
+
+class Notice:
+    """Status line rendered when flushed, so late instant details show."""
+
+    def __init__(self, template: str, *args):
+        self.template = template
+        self.args = args
+
+    def __str__(self):
+        return self.template.format(*self.args)
+
+
+class RateLimiter:
+    """Sliding window allowing `rate` calls every `per` seconds."""
+
+    def __init__(self, rate: int, per: float, *, clock=None):
+        self.rate = rate
+        self.per = per
+        self._clock = clock or time.monotonic
+        self._calls = deque()
+
+    def get_delay(self):
+        """Seconds to wait before the next call is allowed."""
+        now = self._clock()
+        while self._calls and now - self._calls[0] >= self.per:
+            self._calls.popleft()
+        if len(self._calls) < self.rate:
+            return 0
+        return self.per - (now - self._calls[0])
+
+    async def acquire(self):
+        delay = self.get_delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.get_delay()
+        self._calls.append(self._clock())
+
+
+class ChannelStatus:
+    """The status message of a text channel and the updates pending on it."""
+
+    def __init__(self, channel, limiter: RateLimiter, max_lines: int):
+        self.channel = channel
+        self.limiter = limiter
+        self.message = None
+        self.sent_at = 0
+        self.embed = None
+        self.lines = deque(maxlen=max_lines)
+        self.pending = deque()
+        self.dirty = False
+        self.task = None
+
+    def render(self):
+        self.lines.extend(self.pending)
+        self.pending.clear()
+        self.dirty = False
+        return '\n'.join(str(line) for line in self.lines) or None
+
+
+class MessageScheduler:
+    """Coalesces the bot's channel notices into one status message.
+
+    Each text channel gets a single status message holding the sound now
+    playing and the last `max_lines` notices (enqueued sounds, errors).
+    Updates made while one is waiting to be sent are merged into it, and
+    the message is edited in place rather than a new one being sent, at
+    most `rate` times every `per` seconds per channel (Discord's message
+    bucket) and `global_rate` times a second overall. A message older
+    than `max_age` is replaced by a new one, so it stays in view.
+    """
+
+    RATE = 5
+    PER = 5
+    GLOBAL_RATE = 40
+    MAX_LINES = 10
+    MAX_AGE = 5 * 60  # 5 minutes
+
+    def __init__(
+        self,
+        *,
+        rate: int = RATE,
+        per: float = PER,
+        global_rate: int = GLOBAL_RATE,
+        max_lines: int = MAX_LINES,
+        max_age: float = MAX_AGE,
+        clock=None,
+    ):
+        self.rate = rate
+        self.per = per
+        self.max_lines = max_lines
+        self.max_age = max_age
+        self._clock = clock or time.monotonic
+        self._global = RateLimiter(global_rate, 1, clock=self._clock)
+        self._channels = {}
+
+        self.events = {
+            'sent': 0,
+            'edited': 0,
+            'merged': 0,
+            'dropped': 0,
+            'rate_limited': 0,
+            'failed': 0,
+        }
+
+    @property
+    def stats(self):
+        return dict(self.events)
+
+    def count(self, event: str):
+        self.events[event] += 1
+        metrics.CHANNEL_MESSAGES.inc(event=event)
+
+    def get_status(self, channel):
+        status = self._channels.get(channel.id)
+        if status is None:
+            limiter = RateLimiter(self.rate, self.per, clock=self._clock)
+            status = ChannelStatus(channel, limiter, self.max_lines)
+            self._channels[channel.id] = status
+        return status
+
+    def notify(self, channel, line):
+        """Add a notice line to the status message of `channel`."""
+        status = self.get_status(channel)
+        status.pending.append(line)
+        if len(status.pending) > self.max_lines:
+            # Would scroll off before ever being shown.
+            status.pending.popleft()
+            self.count('dropped')
+        self.schedule(status)
+
+    def now_playing(self, channel, embed: discord.Embed):
+        """Show `embed` as the sound now playing in `channel`."""
+        status = self.get_status(channel)
+        status.embed = embed
+        self.schedule(status)
+
+    def touch(self, channel):
+        """Render the status of `channel` again, such as late details."""
+        status = self._channels.get(channel.id)
+        if status is not None and status.message is not None:
+            self.schedule(status)
+
+    def schedule(self, status: ChannelStatus):
+        if status.dirty:
+            self.count('merged')
+            return
+        status.dirty = True
+        if status.task is None:
+            status.task = asyncio.get_running_loop().create_task(
+                self.flush(status)
+            )
+
+    async def flush(self, status: ChannelStatus):
+        try:
+            while status.dirty:
+                await status.limiter.acquire()
+                await self._global.acquire()
+                content = status.render()
+                try:
+                    await self.send(status, content)
+                except discord.RateLimited as e:
+                    self.count('rate_limited')
+                    status.dirty = True
+                    await asyncio.sleep(e.retry_after)
+                except discord.NotFound as e:
+                    if status.message is None:
+                        # The channel itself is gone, stop updating it.
+                        self.count('failed')
+                        logger.warning(f'Could not send status message: {e!r}')
+                        if self._channels.get(status.channel.id) is status:
+                            del self._channels[status.channel.id]
+                        return
+                    # Deleted by someone, post a new one.
+                    status.message = None
+                    status.dirty = True
+                except discord.HTTPException as e:
+                    self.count('failed')
+                    logger.warning(f'Could not update status message: {e!r}')
+        finally:
+            status.task = None
+
+    async def send(self, status: ChannelStatus, content):
+        now = self._clock()
+        if status.message is not None and now - status.sent_at < self.max_age:
+            await status.message.edit(content=content, embed=status.embed)
+            self.count('edited')
+            return
+        status.message = None  # Replaced, even if sending fails.
+        status.message = await status.channel.send(
+            content=content, embed=status.embed
+        )
+        status.sent_at = now
+        self.count('sent')
+
+    def discard(self, channel):
+        """Forget `channel`, once nothing plays there anymore."""
+        status = self._channels.pop(channel.id, None)
+        if status is not None and status.task is not None:
+            status.task.cancel()
@@ -0,0 +1,266 @@
+import bisect
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+from crawler.lazy import lazy_import
+
+# The HTTP server is only loaded when the metrics endpoint is enabled.
+web = lazy_import('aiohttp.web')
+
+
+def format_labels(labelnames, labelvalues, **extra):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra.items())
+    if not pairs:
+        return ''
+    labels = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value in pairs
+    )
+    return f'{{{labels}}}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def get_key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels):
+        return self._values.get(self.get_key(labels), 0)
+
+    def collect(self):
+        return self._values.items()
+
+    def render(self, **const_labels):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for key, value in self.collect():
+            labels = format_labels(self.labelnames, key, **const_labels)
+            lines.append(f'{self.name}{labels} {value}')
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.get_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Gauge set directly or computed by a callback at scrape time.
+
+    The callback returns either a single value or, for labelled gauges, a
+    mapping of label value tuples to values.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        self._values[self.get_key(labels)] = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def collect(self):
+        if self._function is None:
+            return self._values.items()
+        values = self._function()
+        if not isinstance(values, dict):
+            return [((), values)]
+        return [
+            (tuple(str(value) for value in key), value)
+            for key, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self.get_key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # One count per bucket plus +Inf, then the sum.
+            entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels):
+        entry = self._values.get(self.get_key(labels))
+        return sum(entry[:-1]) if entry else 0
+
+    def render(self, **const_labels):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for key, entry in self._values.items():
+            count = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), entry[:-1]):
+                count += bucket
+                labels = format_labels(
+                    self.labelnames, key, **const_labels, le=bound
+                )
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = format_labels(self.labelnames, key, **const_labels)
+            lines.append(f'{self.name}_sum{labels} {entry[-1]}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    """Collection of metrics, optionally sharing constant labels.
+
+    Constant labels (such as the cluster of a sharded deployment) are added
+    to every sample, so several processes can be scraped side by side.
+    """
+
+    def __init__(self, **const_labels):
+        self._metrics = {}
+        self.const_labels = const_labels
+
+    def register(self, metric: Metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(**self.const_labels))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        'myinstants_stage_seconds',
+        'Latency of each stage of the /mi pipeline and audio player.',
+        ['stage'],
+    )
+)
+REQUESTS = REGISTRY.register(
+    Counter(
+        'myinstants_requests_total',
+        'Number of /mi requests by outcome.',
+        ['outcome'],
+    )
+)
+VOICE_STATES = REGISTRY.register(
+    Gauge('myinstants_voice_states', 'Number of active voice states.')
+)
+VOICE_STATE_BYTES = REGISTRY.register(
+    Gauge(
+        'myinstants_voice_state_bytes',
+        'Approximate memory held by voice states and their queues.',
+    )
+)
+REAPED_VOICE_STATES = REGISTRY.register(
+    Counter(
+        'myinstants_voice_states_reaped_total',
+        'Number of voice states evicted, by reason.',
+        ['reason'],
+    )
+)
+QUEUED_SONGS = REGISTRY.register(
+    Gauge('myinstants_queued_songs', 'Number of songs waiting in queues.')
+)
+CACHE_EVENTS = REGISTRY.register(
+    Gauge(
+        'myinstants_cache_events',
+        'Cumulative cache events (hits, misses, evictions...) by cache.',
+        ['cache', 'event'],
+    )
+)
+FFMPEG_PROCESSES = REGISTRY.register(
+    Gauge(
+        'myinstants_ffmpeg_processes',
+        'Number of ffmpeg processes running, waiting for a slot or warm.',
+        ['state'],
+    )
+)
+STARTUP_SECONDS = REGISTRY.register(
+    Gauge(
+        'myinstants_startup_seconds',
+        'Duration of each phase of the last startup.',
+        ['phase'],
+    )
+)
+CHANNEL_MESSAGES = REGISTRY.register(
+    Counter(
+        'myinstants_channel_messages_total',
+        'Status message updates sent, edited, merged, dropped or failed.',
+        ['event'],
+    )
+)
+
+
+class MetricsServer:
+    """Serves a registry in Prometheus text format over HTTP."""
+
+    def __init__(
+        self,
+        registry: Registry = REGISTRY,
+        *,
+        host: str = '127.0.0.1',
+        port: int = 9100,
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(
+            text=self.registry.render(),
+            content_type='text/plain',
+            headers={'X-Content-Type-Options': 'nosniff'},
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f'Serving metrics on http://{self.host}:{self.port}/')
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,121 @@
+import audioop
+import threading
+
+import discord
+from loguru import logger
+
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+SAMPLE_WIDTH = 2
+# Sources are summed as 32-bit samples scaled down by HEADROOM, so up to
+# HEADROOM full-scale sources add up without overflowing before the final
+# clip back to 16 bits.
+HEADROOM = 256
+
+
+def pad(frame: bytes):
+    """Pad the last, shorter frame of a sound with silence."""
+    if len(frame) < FRAME_SIZE:
+        return frame + bytes(FRAME_SIZE - len(frame))
+    return frame
+
+
+def mix(frames):
+    """Sum `(pcm_frame, volume)` pairs of 16-bit PCM into one clipped frame.
+
+    Samples are widened to 32 bits so intermediate sums cannot saturate,
+    then clipped once to the 16-bit range: a loud sound cancelled by an
+    inverted one mixes back to the right value instead of a clipped one.
+    """
+    if len(frames) == 1:
+        frame, volume = frames[0]
+        frame = pad(frame)
+        return frame if volume == 1 else audioop.mul(frame, 2, volume)
+
+    total = None
+    for frame, volume in frames:
+        wide = audioop.mul(
+            audioop.lin2lin(pad(frame), SAMPLE_WIDTH, 4), 4, volume / HEADROOM
+        )
+        total = wide if total is None else audioop.add(total, wide, 4)
+    # Saturates at the 32-bit range, which is exactly the 16-bit one once
+    # the low 16 bits are dropped.
+    return audioop.lin2lin(audioop.mul(total, 4, HEADROOM), 4, SAMPLE_WIDTH)
+
+
+class Track:
+    def __init__(self, source: discord.AudioSource, volume: float = 1.0):
+        self.source = source
+        self.volume = volume
+        # Opus cache hits are decoded back to PCM to be mixed.
+        self.decoder = discord.opus.Decoder() if source.is_opus() else None
+
+    def read(self):
+        frame = self.source.read()
+        if frame and self.decoder is not None:
+            frame = self.decoder.decode(frame)
+        return frame
+
+
+class Mixer(discord.AudioSource):
+    """PCM source playing several sources at once, as a soundboard does.
+
+    Each 20 ms frame reads one frame from every track and sums them with
+    `mix`. Finished tracks are cleaned up straight away, and the mixer
+    ends once every track has. At most `max_tracks` sounds play at once
+    so a frame stays well within its deadline.
+    """
+
+    MAX_TRACKS = 16
+
+    def __init__(self, max_tracks: int = MAX_TRACKS):
+        self.max_tracks = max_tracks
+        self._tracks = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def add(self, source: discord.AudioSource, volume: float = 1.0):
+        """Start mixing `source` in, return False if the mixer is full."""
+        track = Track(source, volume)
+        with self._lock:
+            if len(self._tracks) >= self.max_tracks:
+                return False
+            self._tracks.append(track)
+        return True
+
+    def read(self):
+        with self._lock:
+            tracks = list(self._tracks)
+
+        frames = []
+        for track in tracks:
+            try:
+                frame = track.read()
+            except Exception as e:
+                logger.warning(f'Dropping a mixed sound: {e!r}')
+                frame = b''
+            if frame:
+                frames.append((frame, track.volume))
+            else:
+                self.remove(track)
+
+        if not frames:
+            return b''
+        return mix(frames)
+
+    def remove(self, track: Track):
+        with self._lock:
+            if track not in self._tracks:
+                return
+            self._tracks.remove(track)
+        track.source.cleanup()
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        with self._lock:
+            tracks, self._tracks = self._tracks, []
+        for track in tracks:
+            track.source.cleanup()
@@ -0,0 +1,230 @@
+import asyncio
+import mmap
+import struct
+from collections import OrderedDict
+
+import discord
+from loguru import logger
+
+from bot.audio_cache import AudioCache
+from bot.ffmpeg import FFmpegScheduler
+from crawler.singleflight import SingleFlight
+
+# Every packet is stored as a little-endian uint16 length followed by the
+# packet itself, so a cache file is just the concatenated 20 ms frames.
+FRAME_HEADER = struct.Struct('<H')
+
+
+def pack_frames(frames):
+    return b''.join(FRAME_HEADER.pack(len(frame)) + frame for frame in frames)
+
+
+class OpusFrames:
+    """Read-only sequence of Opus packets backed by a mmap'd cache file."""
+
+    def __init__(self, buffer, offsets):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offsets = []
+        position = 0
+        while position < len(buffer):
+            (length,) = FRAME_HEADER.unpack_from(buffer, position)
+            position += FRAME_HEADER.size
+            offsets.append((position, position + length))
+            position += length
+        return cls(buffer, offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        start, end = self._offsets[index]
+        return self._buffer[start:end]
+
+
+class OpusFrameSource(discord.AudioSource):
+    """Replays pre-encoded 20 ms Opus packets without spawning FFmpeg."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self.frames):
+            return b''
+        frame = self.frames[self._index]
+        self._index += 1
+        return frame
+
+    def is_opus(self):
+        return True
+
+
+class OpusFrameStore(AudioCache):
+    SUFFIX = '.opus'
+
+
+class OpusCache:
+    """Two-level (memory, then disk) cache of pre-encoded instants.
+
+    A sound is only encoded once it has been played `min_plays` times at
+    the same volume, since the volume is baked into the encoded frames.
+    """
+
+    MEMORY_BYTES = 32 * 1024 * 1024  # 32 MiB
+    DISK_BYTES = 256 * 1024 * 1024  # 256 MiB
+    MIN_PLAYS = 3
+    MAX_TRACKED_PLAYS = 4096
+    BITRATE = 128
+    SCHEDULER_KEY = 'opus_cache'
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        memory_bytes: int = MEMORY_BYTES,
+        disk_bytes: int = DISK_BYTES,
+        min_plays: int = MIN_PLAYS,
+    ):
+        self.store = OpusFrameStore(directory, disk_bytes)
+        self.memory_bytes = memory_bytes
+        self.memory_size = 0
+        self.min_plays = min_plays
+        self._memory = OrderedDict()
+        self._plays = OrderedDict()
+        self._encodings = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.encodes = 0
+
+    @staticmethod
+    def get_key(url: str, volume: float):
+        return f'{url}#volume={round(volume, 2)}'
+
+    def __contains__(self, key):
+        return key in self._memory or key in self.store
+
+    def get(self, url: str, volume: float):
+        """Return the cached frames for `url` at `volume`, or None."""
+        key = self.get_key(url, volume)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        path = self.store.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return OpusFrames.from_file(path)
+
+    def record_play(self, url: str, volume: float):
+        """Count a play, return whether the sound should now be encoded."""
+        key = self.get_key(url, volume)
+        plays = self._plays.pop(key, 0) + 1
+        self._plays[key] = plays
+        if len(self._plays) > self.MAX_TRACKED_PLAYS:
+            self._plays.popitem(last=False)
+
+        return (
+            plays >= self.min_plays
+            and key not in self
+            and key not in self._encodings
+        )
+
+    def snapshot(self):
+        """Play counts, so sounds close to `min_plays` survive a restart."""
+        return list(self._plays.items())
+
+    def restore(self, plays):
+        for key, count in plays:
+            self._plays[key] = self._plays.pop(key, 0) + count
+        while len(self._plays) > self.MAX_TRACKED_PLAYS:
+            self._plays.popitem(last=False)
+
+    def remember(self, key: str, frames: list):
+        size = sum(len(frame) for frame in frames)
+        if size > self.memory_bytes:
+            return
+
+        self.memory_size -= self._memory.pop(key, (None, 0))[1]
+        self._memory[key] = (frames, size)
+        self.memory_size += size
+        while self.memory_size > self.memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self.memory_size -= evicted_size
+
+    async def encode(
+        self,
+        source: str,
+        url: str,
+        volume: float,
+        *,
+        scheduler: FFmpegScheduler = None,
+    ):
+        """Encode `source` (a path or URL) once and cache its frames.
+
+        The encoder is an ffmpeg process, so it waits for a slot of
+        `scheduler` like the ones playing sounds.
+        """
+        key = self.get_key(url, volume)
+        return await self._encodings.do(
+            key, self._encode, source, key, volume, scheduler
+        )
+
+    async def _encode(self, source, key, volume, scheduler):
+        loop = asyncio.get_running_loop()
+        if scheduler is not None:
+            # Queued as one more guild, so encodes never starve playback.
+            await scheduler.acquire(self.SCHEDULER_KEY)
+        try:
+            frames = await loop.run_in_executor(
+                None, self.read_frames, source, volume
+            )
+        finally:
+            if scheduler is not None:
+                scheduler.release()
+        if not frames:
+            return None
+
+        content = pack_frames(frames)
+        store_key = self.store.get_key(key)
+        await loop.run_in_executor(None, self.store.write, store_key, content)
+        self.store.add(store_key, len(content))
+        self.remember(key, frames)
+        self.encodes += 1
+        logger.debug(f'Encoded {len(frames)} Opus frame(s) for "{key}"')
+        return frames
+
+    def read_frames(self, source: str, volume: float):
+        audio = discord.FFmpegOpusAudio(
+            source,
+            bitrate=self.BITRATE,
+            options=f'-vn -frame_duration 20 -filter:a volume={volume}',
+        )
+        try:
+            return list(iter(audio.read, b''))
+        finally:
+            audio.cleanup()
+
+    @property
+    def stats(self):
+        return {
+            'memory_entries': len(self._memory),
+            'memory_bytes': self.memory_size,
+            'disk_entries': len(self.store),
+            'disk_bytes': self.store.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'encodes': self.encodes,
+        }
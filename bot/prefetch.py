@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+import discord
+from loguru import logger
+
+
+class BufferedSource(discord.AudioSource):
+    """Audio source that can read frames ahead of playback."""
+
+    def __init__(self, original: discord.AudioSource, prefetcher):
+        self.original = original
+        self.prefetcher = prefetcher
+        self.future = None
+        self._frames = deque()
+        self._stopped = threading.Event()
+
+    @property
+    def buffered_frames(self):
+        return len(self._frames)
+
+    def fill(self, max_frames: int):
+        """Read up to `max_frames` ahead. Blocking, run it in an executor."""
+        while len(self._frames) < max_frames and not self._stopped.is_set():
+            if not self.prefetcher.reserve(discord.opus.Encoder.FRAME_SIZE):
+                break
+            frame = self.original.read()
+            if not frame:
+                self.prefetcher.release(discord.opus.Encoder.FRAME_SIZE)
+                self._frames.append(b'')
+                break
+            self._frames.append(frame)
+
+    def stop(self):
+        self._stopped.set()
+
+    def read(self):
+        if self._frames:
+            frame = self._frames.popleft()
+            if frame:
+                self.prefetcher.release(discord.opus.Encoder.FRAME_SIZE)
+            return frame
+        return self.original.read()
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.stop()
+        while self._frames:
+            if self._frames.popleft():
+                self.prefetcher.release(discord.opus.Encoder.FRAME_SIZE)
+        self.original.cleanup()
+
+
+class Prefetcher:
+    """Pre-buffers the first frames of the next queued sounds.
+
+    While a sound plays, the first `frames` 20 ms PCM frames of the next
+    `depth` songs in the queue are read off their ffmpeg pipes, so the next
+    sound starts from memory instead of waiting for ffmpeg and the network.
+    All buffers share a `max_bytes` memory budget.
+    """
+
+    DEPTH = 2
+    FRAMES = 50  # 1 second
+    MAX_BYTES = 64 * 1024 * 1024  # 64 MiB
+
+    def __init__(
+        self,
+        depth: int = DEPTH,
+        frames: int = FRAMES,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.depth = depth
+        self.frames = frames
+        self.max_bytes = max_bytes
+        self.buffered_bytes = 0
+        self._lock = threading.Lock()
+
+        self.prefetched = 0
+
+    def reserve(self, size: int):
+        with self._lock:
+            if self.buffered_bytes + size > self.max_bytes:
+                return False
+            self.buffered_bytes += size
+            return True
+
+    def release(self, size: int):
+        with self._lock:
+            self.buffered_bytes -= size
+
+    def prefetch(self, songs, *, loop: asyncio.AbstractEventLoop):
+        """Start pre-buffering the first `depth` songs of `songs`."""
+        for song in itertools.islice(songs, self.depth):
+            source = song.source
+            original = getattr(source, 'original', None)
+            # Opus cache hits are already in memory and need no prefetch.
+            if original is None or isinstance(original, BufferedSource):
+                continue
+
+            buffered = BufferedSource(original, self)
+            source.original = buffered
+            buffered.future = loop.run_in_executor(
+                None, buffered.fill, self.frames
+            )
+            self.prefetched += 1
+
+    async def ready(self, song):
+        """Stop pre-buffering `song` and wait for its reader to return."""
+        buffered = getattr(song.source, 'original', None)
+        if not isinstance(buffered, BufferedSource) or not buffered.future:
+            return
+
+        buffered.stop()
+        try:
+            await buffered.future
+        except Exception as e:
+            logger.warning(f'Could not prefetch "{song.source.url}": {e!r}')
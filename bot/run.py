@@ -1,40 +1,283 @@
 import asyncio
+import functools
 import os
+import signal
 
 from discord import Activity, ActivityType, Intents
 from discord.ext import commands
 from loguru import logger
 
+from bot.audio_cache import AudioCache
+from bot.autocomplete import NameIndex
 from bot.client import InstantClient
+from bot.ffmpeg import FFmpegScheduler
+from bot.lifecycle import VoiceStateReaper
+from bot.loudness import LoudnessStore
+from bot.opus_cache import OpusCache
+from bot.prefetch import Prefetcher
+from bot.snapshot import Snapshotter
+from bot.startup import CommandSync, StartupTimer
+from bot.song import SongQueue
+from crawler.index import InstantsIndex
 from bot.exceptions import MissingBotToken
+from bot.metrics import REGISTRY, MetricsServer
 
-intents = Intents.default()
 
-bot = commands.Bot(
-    command_prefix=commands.when_mentioned_or('>'),
-    description='Play audio from myinstants',
-    activity=Activity(
-        type=ActivityType.listening,
-        name="We're back baby! /mi",
-    ),
-    intents=intents,
-)
+def create_bot(
+    *, sharded=False, shard_count=None, shard_ids=None, startup=None
+):
+    """Create the bot, as an `AutoShardedBot` when sharding is enabled.
 
+    `shard_ids` restricts the bot to a subset of `shard_count` shards, which
+    is how each process of a cluster owns its shard range. The phases of
+    the startup are recorded in `startup`, if given.
+    """
+    startup = startup or StartupTimer()
+    command_sync = CommandSync(
+        os.getenv('MYINSTANTS_COMMANDS_HASH_PATH', 'cache/commands.sha256')
+    )
+    ready = False
+    options = {}
+    if sharded:
+        bot_class = commands.AutoShardedBot
+        options = {'shard_count': shard_count, 'shard_ids': shard_ids}
+    else:
+        bot_class = commands.Bot
 
-@bot.event
-async def on_ready():
-    logger.debug(f'Logged in as: {bot.user.name} - {bot.user.id}')
-    synced = await bot.tree.sync()
-    logger.debug(f'Synced {len(synced)} command(s)')
+    bot = bot_class(
+        command_prefix=commands.when_mentioned_or('>'),
+        description='Play audio from myinstants',
+        activity=Activity(
+            type=ActivityType.listening,
+            name="We're back baby! /mi",
+        ),
+        intents=Intents.default(),
+        **options,
+    )
+
+    @bot.event
+    async def setup_hook():
+        # Runs on the bot's own loop before connecting to the gateway.
+        startup.mark('login')
+        metrics_port = os.getenv('MYINSTANTS_METRICS_PORT')
+        if metrics_port:
+            cluster = REGISTRY.const_labels.get('cluster', 0)
+            await MetricsServer(
+                host=os.getenv('MYINSTANTS_METRICS_HOST', '127.0.0.1'),
+                # Each cluster process serves metrics on its own port.
+                port=int(metrics_port) + int(cluster),
+            ).start()
+        await add_cogs(bot)
+        install_signal_handlers(bot)
+        startup.mark('setup')
+
+    @bot.event
+    async def on_ready():
+        nonlocal ready
+        logger.debug(f'Logged in as: {bot.user.name} - {bot.user.id}')
+        # Fired again on every reconnect, with nothing left to set up.
+        if ready:
+            return
+        ready = True
+        startup.mark('connect')
+        # Commands are global, one cluster syncs them for all.
+        if REGISTRY.const_labels.get('cluster', '0') == '0':
+            await command_sync.sync(bot.tree, bot.application_id)
+        startup.mark('sync')
+        startup.report()
+
+    return bot
+
+
+def install_signal_handlers(bot):
+    """Close `bot` cleanly on SIGTERM, as sent by docker when stopping.
+
+    `Client.run` only handles Ctrl-C, so without this the cogs would not
+    unload and the last queue changes would not be saved.
+    """
+    loop = asyncio.get_running_loop()
+
+    def close():
+        logger.info('Received SIGTERM, shutting down')
+        loop.create_task(bot.close())
+
+    try:
+        loop.add_signal_handler(signal.SIGTERM, close)
+    except (NotImplementedError, RuntimeError):
+        # Windows, or not the main thread.
+        logger.debug('Could not handle SIGTERM')
+
+
+def get_cache_dir(variable, default):
+    """Return a cache directory, private to the cluster process if any."""
+    directory = os.getenv(variable, default)
+    cluster = REGISTRY.const_labels.get('cluster')
+    if cluster is not None:
+        directory = os.path.join(directory, f'cluster-{cluster}')
+    return directory
+
+
+def get_snapshot_path(path):
+    """Return the snapshot file, one per cluster process if any."""
+    cluster = REGISTRY.const_labels.get('cluster')
+    if cluster is not None:
+        root, ext = os.path.splitext(path)
+        path = f'{root}-cluster-{cluster}{ext}'
+    return path
 
 
 async def add_cogs(bot):
-    await bot.add_cog(InstantClient(bot))
+    audio_cache = AudioCache(
+        get_cache_dir('MYINSTANTS_AUDIO_CACHE_DIR', 'cache/audio'),
+        int(
+            os.getenv(
+                'MYINSTANTS_AUDIO_CACHE_MAX_BYTES', AudioCache.MAX_BYTES
+            )
+        ),
+    )
+    opus_cache = OpusCache(
+        get_cache_dir('MYINSTANTS_OPUS_CACHE_DIR', 'cache/opus'),
+        memory_bytes=int(
+            os.getenv(
+                'MYINSTANTS_OPUS_CACHE_MEMORY_BYTES', OpusCache.MEMORY_BYTES
+            )
+        ),
+        disk_bytes=int(
+            os.getenv('MYINSTANTS_OPUS_CACHE_DISK_BYTES', OpusCache.DISK_BYTES)
+        ),
+    )
+    index_path = os.getenv('MYINSTANTS_INDEX_PATH')
+    index = InstantsIndex(index_path) if index_path else None
+
+    names = NameIndex()
+    names_path = os.getenv('MYINSTANTS_AUTOCOMPLETE_NAMES')
+    if names_path:
+        names.load(names_path)
+    if index is not None:
+        names.update(reversed(index.get_names(names.max_names)))
+    snapshot_path = os.getenv('MYINSTANTS_SNAPSHOT_PATH')
+    snapshotter = (
+        Snapshotter(
+            get_snapshot_path(snapshot_path),
+            interval=float(
+                os.getenv(
+                    'MYINSTANTS_SNAPSHOT_INTERVAL', Snapshotter.INTERVAL
+                )
+            ),
+        )
+        if snapshot_path
+        else None
+    )
+    await bot.add_cog(
+        InstantClient(
+            bot,
+            audio_cache=audio_cache,
+            opus_cache=opus_cache,
+            index=index,
+            names=names,
+            prefetcher=Prefetcher(
+                depth=int(
+                    os.getenv('MYINSTANTS_PREFETCH_DEPTH', Prefetcher.DEPTH)
+                ),
+                max_bytes=int(
+                    os.getenv(
+                        'MYINSTANTS_PREFETCH_MAX_BYTES', Prefetcher.MAX_BYTES
+                    )
+                ),
+            ),
+            scheduler=FFmpegScheduler(
+                int(
+                    os.getenv(
+                        'MYINSTANTS_FFMPEG_MAX_PROCESSES',
+                        FFmpegScheduler.MAX_PROCESSES,
+                    )
+                ),
+                warm_processes=int(
+                    os.getenv(
+                        'MYINSTANTS_FFMPEG_WARM_PROCESSES',
+                        FFmpegScheduler.WARM_PROCESSES,
+                    )
+                ),
+            ),
+            reaper=VoiceStateReaper(
+                interval=float(
+                    os.getenv(
+                        'MYINSTANTS_REAPER_INTERVAL', VoiceStateReaper.INTERVAL
+                    )
+                ),
+                max_idle=float(
+                    os.getenv(
+                        'MYINSTANTS_REAPER_MAX_IDLE', VoiceStateReaper.MAX_IDLE
+                    )
+                ),
+            ),
+            queue_factory=functools.partial(
+                SongQueue,
+                int(
+                    os.getenv('MYINSTANTS_QUEUE_MAX_SIZE', SongQueue.MAX_SIZE)
+                ),
+                int(
+                    os.getenv(
+                        'MYINSTANTS_QUEUE_MAX_PER_USER', SongQueue.MAX_PER_USER
+                    )
+                ),
+                round_robin=bool(os.getenv('MYINSTANTS_QUEUE_ROUND_ROBIN')),
+            ),
+            snapshotter=snapshotter,
+            loudness=LoudnessStore(
+                index,
+                target_rms=float(
+                    os.getenv(
+                        'MYINSTANTS_LOUDNESS_TARGET_RMS',
+                        LoudnessStore.TARGET_RMS,
+                    )
+                ),
+            ),
+        )
+    )
+
+
+def run(bot_token, *, cluster=None, shard_count=None, shard_ids=None):
+    """Run a bot process, optionally as one cluster of a sharded bot."""
+    sharded = bool(
+        cluster is not None or shard_count or os.getenv('MYINSTANTS_SHARDED')
+    )
+    if cluster is not None:
+        name = f'cluster-{cluster}'
+        REGISTRY.const_labels['cluster'] = str(cluster)
+        logger.configure(
+            extra={'cluster': name},
+            patcher=lambda record: record.update(
+                message=f'[{name}] {record["message"]}'
+            ),
+        )
+        logger.info(f'Starting {name} with shards {shard_ids}')
+
+    startup = StartupTimer()
+    bot = create_bot(
+        sharded=sharded,
+        shard_count=shard_count,
+        shard_ids=shard_ids,
+        startup=startup,
+    )
+    bot.run(bot_token)
+
+
+def main():
+    bot_token = os.getenv('MYINSTANTS_BOT_TOKEN')
+    if not bot_token:
+        raise MissingBotToken
+
+    shard_count = os.getenv('MYINSTANTS_SHARD_COUNT')
+    shard_count = int(shard_count) if shard_count else None
+    clusters = int(os.getenv('MYINSTANTS_CLUSTERS', 1))
+    if clusters > 1:
+        from bot.cluster import launch
 
+        launch(bot_token, clusters=clusters, shard_count=shard_count)
+    else:
+        run(bot_token, shard_count=shard_count)
 
-bot_token = os.getenv('MYINSTANTS_BOT_TOKEN')
-if not bot_token:
-    raise MissingBotToken
 
-asyncio.run(add_cogs(bot))
-bot.run(bot_token)
+if __name__ == '__main__':
+    main()
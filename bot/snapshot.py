@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import NamedTuple
+
+from loguru import logger
+
+
+class RestoredContext(NamedTuple):
+    """Stands in for the interaction a restored `VoiceState` came from."""
+
+    guild: object
+    channel: object
+
+
+class Snapshotter:
+    """Periodically saves voice queues and warm caches to a JSON file.
+
+    Queued songs are saved as the descriptors they already are (instant
+    info and requester id), so a restored queue never resolves its sounds
+    again. Guilds from the last snapshot stay pending until restored, and
+    are saved again if the bot restarts before that happens.
+    """
+
+    INTERVAL = 60
+    VERSION = 1
+
+    def __init__(self, path: str, *, interval: float = INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._task = None
+
+        self.saves = 0
+
+    def dump(self, client):
+        guilds = {
+            str(guild_id): snapshot
+            for guild_id, snapshot in client.pending_restores.items()
+        }
+        for guild_id, state in client.voice_states.items():
+            snapshot = state.snapshot()
+            if snapshot:
+                guilds[str(guild_id)] = snapshot
+        return {
+            'version': self.VERSION,
+            'saved_at': time.time(),
+            'guilds': guilds,
+            'names': client.names.snapshot(),
+            'opus_plays': (
+                client.opus_cache.snapshot() if client.opus_cache else []
+            ),
+            'search_results': (
+                client.crawler.search_cache.snapshot()
+                if client.crawler.search_cache is not None
+                else []
+            ),
+        }
+
+    def write(self, content: str):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def save(self, client):
+        snapshot = self.dump(client)
+        self.write(json.dumps(snapshot, default=str))
+        self.saves += 1
+        return snapshot
+
+    def load(self):
+        """Return the last snapshot, or None if missing or unusable."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f'Could not load snapshot "{self.path}": {e!r}')
+            return None
+
+        if snapshot.get('version') != self.VERSION:
+            logger.warning(f'Ignoring outdated snapshot "{self.path}"')
+            return None
+        return snapshot
+
+    async def run(self, client):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            # Dumped on the loop for a consistent view, written off it.
+            content = json.dumps(self.dump(client), default=str)
+            try:
+                await loop.run_in_executor(None, self.write, content)
+                self.saves += 1
+            except OSError as e:
+                logger.warning(f'Could not save snapshot: {e!r}')
+
+    def start(self, client):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self.run(client)
+            )
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,65 +1,272 @@
 import asyncio
+import bisect
+import collections
 import itertools
 import random
+import time
 
 import discord
-from bot.ytdl import YTDLSource
+from loguru import logger
 
+from bot.exceptions import QueueFull
+from bot.ytdl import InstantMetadata
 
-class Song:
-    __slots__ = ('source', 'requester')
 
-    def __init__(self, source: YTDLSource):
-        self.source = source
-        self.requester = source.requester
+class Song(InstantMetadata):
+    """Queued instant, holding only what is needed to play it later.
+
+    The audio source, and with it the ffmpeg process, is only created when
+    the song is about to play, so queue length does not cost processes.
+    """
+
+    def __init__(
+        self,
+        info: dict,
+        *,
+        requester_id: int,
+        details: asyncio.Future = None,
+    ):
+        self.init_metadata(info)
+        self.requester_id = requester_id
+        self.created_at = time.perf_counter()
+        self._source = None
+        # Instant details (title, likes, views...) are fetched concurrently
+        # with the audio and merged once they arrive.
+        self.details = details
+        if details is not None:
+            details.add_done_callback(self._merge_details)
+
+    def snapshot(self):
+        return {'info': self.data, 'requester_id': self.requester_id}
+
+    @classmethod
+    def restore(cls, snapshot: dict):
+        return cls(snapshot['info'], requester_id=snapshot['requester_id'])
+
+    @property
+    def requester_mention(self):
+        return f'<@{self.requester_id}>'
+
+    @property
+    def source(self):
+        """The audio source, or None until it has been created."""
+        if self._source is None or not self._source.done():
+            return None
+        if self._source.cancelled() or self._source.exception():
+            return None
+        return self._source.result()
+
+    def ensure_source(self, factory):
+        """Create the source with `factory` once, return its future.
+
+        `factory` is a coroutine function taking the song. Both the audio
+        player and the prefetcher may ask for the source, and share it.
+        """
+        if self._source is None:
+            self._source = asyncio.ensure_future(factory(self))
+        return self._source
+
+    def _merge_details(self, future: asyncio.Future):
+        if future.cancelled():
+            return
+        if future.exception():
+            logger.warning(
+                f'Could not fetch instant details: {future.exception()!r}'
+            )
+            return
+        self.update_details(future.result())
+        if self.source is not None:
+            self.source.update_details(future.result())
+
+    @property
+    def has_pending_details(self):
+        return self.details is not None and not self.details.done()
+
+    async def wait_for_details(self):
+        """Wait for the late-bound details, return whether they were merged."""
+        if self.details is None:
+            return False
+        await asyncio.wait([self.details])
+        return not self.details.cancelled() and not self.details.exception()
 
     def create_embed(self):
         embed = (
             discord.Embed(
                 title='Now playing',
-                description='```css\n{0.source.title}\n```'.format(self),
+                description='```css\n{0.title}\n```'.format(self),
                 color=discord.Color.blurple(),
             )
-            .add_field(name='Requested by', value=self.requester.mention)
+            .add_field(name='Requested by', value=self.requester_mention)
             .add_field(
                 name='Uploader',
-                value=(
-                    '[{0.source.uploader}]({0.source.uploader_url})'.format(
-                        self
-                    )
-                ),
+                value='[{0.uploader}]({0.uploader_url})'.format(self),
             )
-            .add_field(
-                name='URL', value=('[Click]({0.source.url})'.format(self))
-            )
-            .add_field(name='Views', value=self.source.views)
-            .add_field(name='Likes', value=self.source.likes)
-            .set_thumbnail(url=self.source.thumbnail)
+            .add_field(name='URL', value='[Click]({0.url})'.format(self))
+            .add_field(name='Views', value=self.views)
+            .add_field(name='Likes', value=self.likes)
+            .set_thumbnail(url=self.thumbnail)
         )
 
         return embed
 
 
-class SongQueue(asyncio.Queue):
+class SongQueue:
+    """Capped song queue with positional access and optional fairness.
+
+    Songs are kept in a list sorted by a `(tag, sequence)` key, so pages,
+    removals and moves are plain list operations bounded by `max_size`.
+    In FIFO mode tags only grow. In `round_robin` mode a song is tagged
+    one round after its requester's previous queued song (or after the
+    song playing now), which interleaves requesters so one user flooding
+    the queue only delays their own songs. Manual reordering (`move`,
+    `shuffle`) retags the queue in its new order.
+
+    Caps apply to the whole guild (`max_size`) and to each requester
+    (`max_per_user`). A value of None disables a cap.
+    """
+
+    MAX_SIZE = 100
+    MAX_PER_USER = 25
+
+    def __init__(
+        self,
+        max_size: int = MAX_SIZE,
+        max_per_user: int = MAX_PER_USER,
+        *,
+        round_robin: bool = False,
+    ):
+        self.max_size = max_size
+        self.max_per_user = max_per_user
+        self.round_robin = round_robin
+
+        self._songs = []
+        self._keys = []
+        self._sequence = itertools.count()
+        self._per_user = collections.Counter()
+        self._last_tags = {}
+        self._played_tag = 0
+        self._getters = collections.deque()
+
     def __getitem__(self, item):
-        if isinstance(item, slice):
-            return list(
-                itertools.islice(self._queue, item.start, item.stop, item.step)
-            )
-        else:
-            return self._queue[item]
+        return self._songs[item]
 
     def __iter__(self):
-        return self._queue.__iter__()
+        return iter(self._songs)
 
     def __len__(self):
-        return self.qsize()
+        return len(self._songs)
+
+    def __contains__(self, song):
+        return any(queued is song for queued in self._songs)
+
+    def qsize(self):
+        return len(self._songs)
+
+    def empty(self):
+        return not self._songs
+
+    def count(self, requester_id: int):
+        return self._per_user[requester_id]
+
+    def check_capacity(self, requester_id: int):
+        """Raise `QueueFull` if `requester_id` cannot add another song."""
+        if self.max_size is not None and len(self._songs) >= self.max_size:
+            raise QueueFull(
+                f'The queue is full ({self.max_size} sounds), '
+                'wait for some to play.'
+            )
+        if (
+            self.max_per_user is not None
+            and self._per_user[requester_id] >= self.max_per_user
+        ):
+            raise QueueFull(
+                f'You already have {self.max_per_user} sounds in the queue.'
+            )
+
+    def get_tag(self, requester_id: int):
+        if not self.round_robin:
+            return self._keys[-1][0] if self._keys else self._played_tag
+        last_tag = self._last_tags.get(requester_id, self._played_tag)
+        return max(last_tag, self._played_tag) + 1
+
+    def put_nowait(self, song):
+        self.check_capacity(song.requester_id)
+        tag = self.get_tag(song.requester_id)
+        key = (tag, next(self._sequence))
+        index = bisect.bisect(self._keys, key)
+        self._keys.insert(index, key)
+        self._songs.insert(index, song)
+        self._per_user[song.requester_id] += 1
+        self._last_tags[song.requester_id] = tag
+
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    async def put(self, song):
+        self.put_nowait(song)
+
+    def get_nowait(self):
+        if not self._songs:
+            raise asyncio.QueueEmpty
+        self._played_tag = self._keys[0][0]
+        return self._pop(0)
+
+    async def get(self):
+        while not self._songs:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                # Pass the wake-up on if this getter was woken for a song.
+                if self._songs and self._getters:
+                    self._getters[0].set_result(None)
+                raise
+        return self.get_nowait()
+
+    def _pop(self, index: int):
+        del self._keys[index]
+        song = self._songs.pop(index)
+        self._per_user[song.requester_id] -= 1
+        if not self._per_user[song.requester_id]:
+            del self._per_user[song.requester_id]
+            self._last_tags.pop(song.requester_id, None)
+        return song
+
+    def _retag(self):
+        """Key the songs by their current order, after a manual reorder."""
+        self._keys = [
+            (self._played_tag + position, next(self._sequence))
+            for position in range(1, len(self._songs) + 1)
+        ]
+        self._last_tags = {
+            song.requester_id: key[0]
+            for song, key in zip(self._songs, self._keys)
+        }
 
     def clear(self):
-        self._queue.clear()
+        self._songs.clear()
+        self._keys.clear()
+        self._per_user.clear()
+        self._last_tags.clear()
 
     def shuffle(self):
-        random.shuffle(self._queue)
+        random.shuffle(self._songs)
+        self._retag()
 
     def remove(self, index: int):
-        del self._queue[index]
+        return self._pop(index)
+
+    def move(self, index: int, position: int):
+        """Move the song at `index` so that it ends up at `position`."""
+        song = self._songs.pop(index)
+        self._songs.insert(position, song)
+        self._retag()
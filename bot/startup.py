@@ -0,0 +1,101 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+
+from loguru import logger
+
+from bot import metrics
+
+
+class StartupTimer:
+    """Times the phases of a bot's startup, until it is first ready.
+
+    The first phase, `imports`, is the CPU time the process used before
+    the timer was created, which is mostly spent importing modules.
+    """
+
+    def __init__(self, *, clock=None):
+        self._clock = clock or time.perf_counter
+        self._last = self._clock()
+        self.phases = {}
+        self.record('imports', time.process_time())
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = seconds
+        metrics.STARTUP_SECONDS.set(seconds, phase=phase)
+
+    def mark(self, phase: str):
+        """End `phase`, which started when the previous one ended."""
+        now = self._clock()
+        self.record(phase, now - self._last)
+        self._last = now
+
+    def report(self):
+        breakdown = ', '.join(
+            f'{phase} {seconds:.2f}s' for phase, seconds in self.phases.items()
+        )
+        total = sum(self.phases.values())
+        logger.info(f'Started in {total:.2f}s ({breakdown})')
+
+
+def get_command_dict(command, tree):
+    # `to_dict` only takes the tree since discord.py 2.4.
+    if 'tree' in inspect.signature(command.to_dict).parameters:
+        return command.to_dict(tree)
+    return command.to_dict()
+
+
+def get_command_fingerprint(tree, application_id=None):
+    """Hash of the slash command definitions, as sent to Discord."""
+    commands = sorted(
+        (get_command_dict(command, tree) for command in tree.get_commands()),
+        key=lambda command: command['name'],
+    )
+    payload = json.dumps(
+        {'application_id': application_id, 'commands': commands},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CommandSync:
+    """Syncs the command tree only when its definitions have changed.
+
+    Syncing is slow and heavily rate-limited, yet `on_ready` fires on every
+    reconnect. The fingerprint of the last synced definitions is kept in
+    `path`, so a restart with the same commands skips the sync entirely.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def save(self, fingerprint: str):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(fingerprint)
+
+    async def sync(self, tree, application_id=None):
+        """Sync `tree` if needed, return whether it was synced."""
+        fingerprint = get_command_fingerprint(tree, application_id)
+        if fingerprint == self.load():
+            logger.debug('Commands unchanged, skipping sync')
+            return False
+
+        synced = await tree.sync()
+        try:
+            self.save(fingerprint)
+        except OSError as e:
+            logger.warning(f'Could not save command fingerprint: {e!r}')
+        logger.debug(f'Synced {len(synced)} command(s)')
+        return True
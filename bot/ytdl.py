@@ -1,14 +1,65 @@
 import discord
-import youtube_dl
 import asyncio
+import audioop
 import functools
+import os
+from urllib.parse import unquote, urlsplit
+from bot import metrics
+from bot.audio_cache import AudioCache
 from bot.exceptions import YTDLError
+from bot.ffmpeg import FFmpegScheduler
+from bot.loudness import LoudnessMeter, LoudnessStore
+from bot.opus_cache import OpusCache, OpusFrameSource
 
-# Ignore console errors
-youtube_dl.utils.bug_reports_message = lambda: ''
+DIRECT_MEDIA_EXTENSIONS = ('.mp3', '.ogg', '.opus', '.wav', '.m4a')
 
 
-class YTDLSource(discord.PCMVolumeTransformer):
+def is_direct_media_url(url: str):
+    return urlsplit(url).path.lower().endswith(DIRECT_MEDIA_EXTENSIONS)
+
+
+class InstantMetadata:
+    """Instant metadata shared by queued songs and playable sources."""
+
+    def init_metadata(self, data: dict):
+        self.data = {}
+        self.update_details(data)
+
+    def update_details(self, details: dict):
+        """Merge instant details that may arrive after playback started."""
+        self.data.update(details)
+        data = self.data
+
+        self.uploader = data.get('uploader_name')
+        self.uploader_url = data.get('uploader_url')
+        self.description = data.get('description')
+        self.title = data.get('title')
+        self.url = data.get('webpage_url')
+        self.views = data.get('views')
+        self.likes = data.get('likes')
+        self.thumbnail = data.get(
+            'thumbnail',
+            'https://images-na.ssl-images-amazon.com/images/I/61LNAo2K9RL.png',
+        )
+        date = data.get('upload_date')
+        self.upload_date = (
+            f'{date[0:4]}-{date[4:6]}-{date[6:8]}' if date else None
+        )
+
+    def __str__(self):
+        return '**{0.title}** by **{0.uploader}**'.format(self)
+
+
+class CachedOpusSource(InstantMetadata, OpusFrameSource):
+    """Instant replayed from the Opus cache, with its volume baked in."""
+
+    def __init__(self, frames, *, data: dict, volume: float = 0.5):
+        super().__init__(frames)
+        self.volume = volume
+        self.init_metadata(data)
+
+
+class YTDLSource(InstantMetadata, discord.PCMVolumeTransformer):
     YTDL_OPTIONS = {
         'format': 'bestaudio/best',
         'extractaudio': True,
@@ -32,40 +83,106 @@ class YTDLSource(discord.PCMVolumeTransformer):
         'options': '-vn',
     }
 
-    ytdl = youtube_dl.YoutubeDL(YTDL_OPTIONS)
+    LOCAL_FFMPEG_OPTIONS = {'options': '-vn'}
+
+    _ytdl = None
+    _release_ffmpeg = None
 
     def __init__(
         self,
-        interaction: discord.Interaction,
         source: discord.FFmpegPCMAudio,
         *,
         data: dict,
         volume: float = 0.5,
+        gain: float = 1.0,
+        meter: LoudnessMeter = None,
     ):
+        # Loudness gain and user volume are applied as a single factor.
+        self.gain = gain
+        self.meter = meter
         super().__init__(source, volume)
+        self.init_metadata(data)
 
-        self.requester = interaction.user
-        self.channel = interaction.channel
-        self.data = data
+    @property
+    def volume(self):
+        return self._volume
 
-        self.uploader = data.get('uploader_name')
-        self.uploader_url = data.get('uploader_url')
-        self.description = data.get('description')
-        self.title = data.get('title')
-        self.url = data.get('webpage_url')
-        self.views = data.get('views')
-        self.likes = data.get('likes')
-        self.thumbnail = data.get(
-            'thumbnail',
-            'https://images-na.ssl-images-amazon.com/images/I/61LNAo2K9RL.png',
-        )
-        date = data.get('upload_date')
-        self.upload_date = (
-            f'{date[0:4]}-{date[4:6]}-{date[6:8]}' if date else None
-        )
+    @volume.setter
+    def volume(self, value: float):
+        self._volume = max(value, 0.0)
+        self._factor = min(self._volume, 2.0) * self.gain
 
-    def __str__(self):
-        return '**{0.title}** by **{0.uploader}**'.format(self)
+    def read(self):
+        frame = self.original.read()
+        if self.meter is not None:
+            self.meter.add(frame)
+        if self._factor == 1:
+            return frame
+        return audioop.mul(frame, 2, self._factor)
+
+    def cleanup(self):
+        # A sound skipped after long enough is still measured.
+        meter, self.meter = self.meter, None
+        if meter is not None:
+            meter.finish()
+        super().cleanup()
+        # Also runs when a queued source is dropped, through __del__.
+        release, self._release_ffmpeg = self._release_ffmpeg, None
+        if release:
+            release()
+
+    @classmethod
+    def get_ytdl(cls):
+        # youtube_dl takes a few hundred milliseconds to import, and plain
+        # media files never need it, so it is only loaded on first use.
+        if cls._ytdl is None:
+            import youtube_dl
+
+            # Ignore console errors
+            youtube_dl.utils.bug_reports_message = lambda: ''
+            cls._ytdl = youtube_dl.YoutubeDL(cls.YTDL_OPTIONS)
+        return cls._ytdl
+
+    @staticmethod
+    def create_ffmpeg_source(source: str, options: dict):
+        with metrics.STAGE_SECONDS.time(stage='ffmpeg_spawn'):
+            return discord.FFmpegPCMAudio(source, **options)
+
+    @classmethod
+    async def create_scheduled(
+        cls,
+        source: str,
+        options: dict,
+        *,
+        data: dict,
+        key=None,
+        scheduler: FFmpegScheduler = None,
+        local: bool = False,
+        **kwargs,
+    ):
+        """Create the source once `scheduler` has a free ffmpeg slot.
+
+        `key` identifies the guild the slot is queued for, `kwargs` are
+        passed on to the source.
+        """
+        if scheduler is None:
+            return cls(
+                cls.create_ffmpeg_source(source, options), data=data, **kwargs
+            )
+
+        with metrics.STAGE_SECONDS.time(stage='ffmpeg_wait'):
+            await scheduler.acquire(key)
+        try:
+            audio = scheduler.take_warm(source) if local else None
+            if audio is None:
+                audio = cls.create_ffmpeg_source(source, options)
+            self = cls(audio, data=data, **kwargs)
+        except BaseException:
+            scheduler.release()
+            raise
+        self._release_ffmpeg = scheduler.release_threadsafe
+        scheduler.refill()
+        return self
 
     @classmethod
     async def create_source(
@@ -77,7 +194,7 @@ class YTDLSource(discord.PCMVolumeTransformer):
     ):
         loop = loop or asyncio.get_event_loop()
         partial = functools.partial(
-            cls.ytdl.extract_info, search, download=False, process=False
+            cls.get_ytdl().extract_info, search, download=False, process=False
         )
         data = await loop.run_in_executor(None, partial)
 
@@ -98,7 +215,7 @@ class YTDLSource(discord.PCMVolumeTransformer):
 
         webpage_url = process_info['webpage_url']
         partial = functools.partial(
-            cls.ytdl.extract_info, webpage_url, download=False
+            cls.get_ytdl().extract_info, webpage_url, download=False
         )
         processed_info = await loop.run_in_executor(None, partial)
 
@@ -120,33 +237,107 @@ class YTDLSource(discord.PCMVolumeTransformer):
         print('ASLAOSDOASD')
         print(info)
         return cls(
-            interaction,
-            discord.FFmpegPCMAudio(info['webpage_url'], **cls.FFMPEG_OPTIONS),
+            cls.create_ffmpeg_source(info['webpage_url'], cls.FFMPEG_OPTIONS),
             data=info,
         )
 
     @classmethod
-    async def from_url(
+    async def get_info(
         cls,
-        interaction: discord.Interaction,
         url: str,
-        instant_details,
+        instant_details: dict,
         *,
         loop: asyncio.BaseEventLoop = None,
     ):
-        loop = loop or asyncio.get_event_loop()
-        partial = functools.partial(
-            cls.ytdl.extract_info, url, download=False, process=False
-        )
-        info = await loop.run_in_executor(None, partial)
+        """Return the info needed to play `url`, without spawning ffmpeg."""
+        if is_direct_media_url(url):
+            info = cls.get_direct_media_info(url)
+        else:
+            loop = loop or asyncio.get_event_loop()
+            partial = functools.partial(
+                cls.get_ytdl().extract_info, url, download=False, process=False
+            )
+            info = await loop.run_in_executor(None, partial)
 
         if info is None:
             raise YTDLError(f"Couldn't fetch `{url}`")
 
         # Merge instant details with the extracted info
         info.update(instant_details)
-        return cls(
-            interaction,
-            discord.FFmpegPCMAudio(info['webpage_url'], **cls.FFMPEG_OPTIONS),
+        return info
+
+    @classmethod
+    async def from_info(
+        cls,
+        info: dict,
+        *,
+        key=None,
+        audio_cache: AudioCache = None,
+        opus_cache: OpusCache = None,
+        scheduler: FFmpegScheduler = None,
+        loudness: LoudnessStore = None,
+        volume: float = 0.5,
+    ):
+        """Create a playable source, preferring the Opus and audio caches.
+
+        With `loudness`, the sound is played at its measured gain, or
+        measured while it plays if it never was.
+        """
+        url = info['webpage_url']
+        gain = loudness.get(url) if loudness else None
+        frames = (
+            opus_cache.get(url, volume * (gain or 1)) if opus_cache else None
+        )
+        if frames is not None:
+            return CachedOpusSource(frames, data=info, volume=volume)
+
+        options = {'gain': gain or 1.0}
+        if loudness and gain is None:
+            options['meter'] = loudness.create_meter(url)
+
+        path = audio_cache.get(url) if audio_cache is not None else None
+        if path:
+            return await cls.create_scheduled(
+                path,
+                cls.LOCAL_FFMPEG_OPTIONS,
+                data=info,
+                key=key,
+                scheduler=scheduler,
+                local=True,
+                **options,
+            )
+
+        return await cls.create_scheduled(
+            url,
+            cls.FFMPEG_OPTIONS,
             data=info,
+            key=key,
+            scheduler=scheduler,
+            **options,
         )
+
+    @classmethod
+    async def from_url(
+        cls,
+        url: str,
+        instant_details: dict,
+        *,
+        loop: asyncio.BaseEventLoop = None,
+        **options,
+    ):
+        info = await cls.get_info(url, instant_details, loop=loop)
+        return await cls.from_info(info, **options)
+
+    @staticmethod
+    def get_direct_media_info(url: str):
+        """Build the info youtube_dl's generic extractor returns for a file."""
+        file_name = unquote(os.path.basename(urlsplit(url).path))
+        title, ext = os.path.splitext(file_name)
+        return {
+            'id': title,
+            'title': title,
+            'url': url,
+            'webpage_url': url,
+            'ext': ext.lstrip('.'),
+            'extractor': 'generic',
+        }
@@ -0,0 +1,126 @@
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import unquote_plus
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(search):
+    """Return the canonical form of a search query used as a cache key.
+
+    `"Vine%20Boom"`, `"vine+boom"` and `"  VINE   boom "` all map to
+    `"vine boom"`.
+    """
+    search = unquote_plus(search)
+    return WHITESPACE.sub(' ', search).strip().casefold()
+
+
+class TTLCache:
+    """Bounded in-memory cache with per-entry expiry and LRU eviction.
+
+    Expired entries are kept for `grace` more seconds, during which only
+    `get_stale` returns them, as a fallback when they cannot be refreshed.
+    """
+
+    MAX_ENTRIES = 512
+    TTL = 600  # 10 minutes
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        ttl: float = TTL,
+        *,
+        grace: float = 0,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.grace = grace
+        self._clock = clock
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            if expires_at + self.grace <= now:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key, default=None):
+        """Return an entry even if expired, as long as it is in grace."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + self.grace <= self._clock():
+            return default
+        self.stale_hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self):
+        """Entries still usable, least recent first, with their time left."""
+        now = self._clock()
+        return [
+            [key, expires_at - now, value]
+            for key, (expires_at, value) in self._entries.items()
+            if expires_at + self.grace > now
+        ]
+
+    def restore(self, entries, *, age: float = 0):
+        """Add snapshot entries, taken `age` seconds ago."""
+        now = self._clock()
+        for key, time_left, value in entries:
+            expires_at = now + time_left - age
+            if expires_at + self.grace > now:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'stale_hits': self.stale_hits,
+        }
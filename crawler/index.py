@@ -0,0 +1,285 @@
+import argparse
+import re
+import sqlite3
+import time
+from urllib.parse import quote_plus
+
+from loguru import logger
+
+from crawler.cache import normalize_query
+from crawler.instants import InstantsCrawler
+from crawler.parsers import get_parser
+
+DETAIL_FIELDS = (
+    'title',
+    'description',
+    'likes',
+    'uploader_name',
+    'uploader_url',
+    'views',
+)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS instants (
+    id INTEGER PRIMARY KEY,
+    instant_link TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    mp3_link TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    likes TEXT,
+    uploader_name TEXT,
+    uploader_url TEXT,
+    views TEXT,
+    last_seen REAL NOT NULL,
+    details_fetched REAL
+);
+CREATE INDEX IF NOT EXISTS instants_details_fetched
+    ON instants (details_fetched);
+CREATE TABLE IF NOT EXISTS gains (
+    url TEXT PRIMARY KEY,
+    gain REAL NOT NULL,
+    measured REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS instants_fts USING fts5(
+    name, title, content='instants', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS instants_ai AFTER INSERT ON instants BEGIN
+    INSERT INTO instants_fts (rowid, name, title)
+    VALUES (new.id, new.name, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS instants_ad AFTER DELETE ON instants BEGIN
+    INSERT INTO instants_fts (instants_fts, rowid, name, title)
+    VALUES ('delete', old.id, old.name, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS instants_au AFTER UPDATE ON instants BEGIN
+    INSERT INTO instants_fts (instants_fts, rowid, name, title)
+    VALUES ('delete', old.id, old.name, old.title);
+    INSERT INTO instants_fts (rowid, name, title)
+    VALUES (new.id, new.name, new.title);
+END;
+'''
+
+TOKEN = re.compile(r'\w+')
+
+
+def build_match_query(search):
+    """Turn a free-form search into an FTS5 prefix query on every token."""
+    tokens = TOKEN.findall(normalize_query(search))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class InstantsIndex:
+    """Local SQLite full-text index of myinstants sounds."""
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM instants'
+        ).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def upsert(self, name, instant_link, mp3_link, *, seen_at):
+        with self.connection:
+            self.connection.execute(
+                '''
+                INSERT INTO instants (name, instant_link, mp3_link, last_seen)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (instant_link) DO UPDATE SET
+                    name = excluded.name,
+                    mp3_link = excluded.mp3_link,
+                    last_seen = excluded.last_seen
+                ''',
+                (name, instant_link, mp3_link, seen_at),
+            )
+
+    def update_details(self, instant_link, details, *, fetched_at):
+        assignments = ', '.join(f'{field} = ?' for field in DETAIL_FIELDS)
+        values = [details.get(field) for field in DETAIL_FIELDS]
+        with self.connection:
+            self.connection.execute(
+                f'UPDATE instants SET {assignments}, details_fetched = ? '
+                'WHERE instant_link = ?',
+                (*values, fetched_at, instant_link),
+            )
+
+    def get_gain(self, url):
+        """Return the loudness gain measured for a sound, or None."""
+        row = self.connection.execute(
+            'SELECT gain FROM gains WHERE url = ?', (url,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_gain(self, url, gain, *, measured_at):
+        with self.connection:
+            self.connection.execute(
+                '''
+                INSERT INTO gains (url, gain, measured) VALUES (?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    gain = excluded.gain,
+                    measured = excluded.measured
+                ''',
+                (url, gain, measured_at),
+            )
+
+    def search(self, search, limit: int = 25):
+        match = build_match_query(search)
+        if not match:
+            return []
+        rows = self.connection.execute(
+            '''
+            SELECT instants.* FROM instants_fts
+            JOIN instants ON instants.id = instants_fts.rowid
+            WHERE instants_fts MATCH ?
+            ORDER BY bm25(instants_fts)
+            LIMIT ?
+            ''',
+            (match, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_single_search_result(self, search):
+        results = self.search(search, limit=1)
+        if not results:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return results[0]
+
+    def get_names(self, limit: int):
+        """Return the names of the most recently seen instants."""
+        rows = self.connection.execute(
+            'SELECT name FROM instants ORDER BY last_seen DESC LIMIT ?',
+            (limit,),
+        )
+        return [row[0] for row in rows]
+
+    def get_stale(self, fetched_before, limit: int = 100):
+        """Return instants whose details are missing or older than a time."""
+        rows = self.connection.execute(
+            '''
+            SELECT * FROM instants
+            WHERE details_fetched IS NULL OR details_fetched < ?
+            ORDER BY details_fetched IS NOT NULL, details_fetched
+            LIMIT ?
+            ''',
+            (fetched_before, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def get_details(record):
+        """Return the stored instant details, or None if never fetched."""
+        if record.get('details_fetched') is None:
+            return None
+        return {field: record[field] for field in DETAIL_FIELDS}
+
+
+class Indexer:
+    """Bulk-crawls myinstants pages into an `InstantsIndex`."""
+
+    LISTING_PATH = '/en/index/us/'
+
+    def __init__(
+        self, crawler: InstantsCrawler, index: InstantsIndex, *, clock=None
+    ):
+        self.crawler = crawler
+        self.index = index
+        self._clock = clock or time.time
+
+    def get_listing_urls(self, pages: int):
+        return [
+            f'{self.crawler.BASE_URL}{self.LISTING_PATH}?page={page}'
+            for page in range(1, pages + 1)
+        ]
+
+    def get_search_urls(self, search, pages: int):
+        query = quote_plus(normalize_query(search))
+        return [
+            f'{self.crawler.BASE_URL}/search?name={query}&page={page}'
+            for page in range(1, pages + 1)
+        ]
+
+    def index_page(self, content):
+        seen_at = self._clock()
+        instants = self.crawler.parser.parse_search_results(content, None)
+        for instant in instants:
+            self.index.upsert(
+                self.crawler.get_instant_name(instant),
+                self.crawler.get_instant_link(instant),
+                self.crawler.get_instant_mp3_link(instant),
+                seen_at=seen_at,
+            )
+        return len(instants)
+
+    def crawl(self, urls):
+        total = 0
+        for url in urls:
+            count = self.index_page(self.crawler.fetch(url))
+            logger.info(f'Indexed {count} instant(s) from "{url}"')
+            total += count
+            if not count:
+                break
+        return total
+
+    def refresh(self, max_age: float, limit: int = 100):
+        """Fetch details for instants never fetched or older than max_age."""
+        now = self._clock()
+        stale = self.index.get_stale(now - max_age, limit)
+        for record in stale:
+            link = record['instant_link']
+            content = self.crawler.fetch(link)
+            details = self.crawler.parse_instant_details(content)
+            self.index.update_details(link, details, fetched_at=now)
+        logger.info(f'Refreshed details of {len(stale)} instant(s)')
+        return len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Crawl myinstants.com into a local SQLite index.'
+    )
+    parser.add_argument('--database', default='instants.db')
+    parser.add_argument(
+        '--pages', type=int, default=10, help='Listing pages to crawl.'
+    )
+    parser.add_argument(
+        '--query',
+        action='append',
+        default=[],
+        help='Also crawl the search pages of this query (repeatable).',
+    )
+    parser.add_argument('--query-pages', type=int, default=3)
+    parser.add_argument(
+        '--refresh-age',
+        type=float,
+        default=7 * 24 * 60 * 60,
+        help='Refetch details older than this many seconds.',
+    )
+    parser.add_argument('--refresh-limit', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    index = InstantsIndex(args.database)
+    indexer = Indexer(InstantsCrawler(parser=get_parser()), index)
+    try:
+        indexer.crawl(indexer.get_listing_urls(args.pages))
+        for search in args.query:
+            indexer.crawl(indexer.get_search_urls(search, args.query_pages))
+        indexer.refresh(args.refresh_age, args.refresh_limit)
+        logger.info(f'Index has {len(index)} instant(s)')
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,48 +1,134 @@
-import re
+import asyncio
+import time
+from urllib.parse import quote_plus
 
-import requests
+import aiohttp
 from loguru import logger
-from bs4 import BeautifulSoup
+
+from crawler.cache import TTLCache, normalize_query
+from crawler.lazy import lazy_import
+from crawler.parsers import SoupParser
+from crawler.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryPolicy,
+    is_retryable,
+)
+from crawler.singleflight import SingleFlight
+
+# Only the blocking crawler used by the indexer needs requests.
+requests = lazy_import('requests')
 
 
 class InstantsCrawler:
     BASE_URL = 'https://www.myinstants.com'
+    TIMEOUT = 10
+    MAX_RESULTS = 25
+
+    def __init__(
+        self,
+        timeout: float = TIMEOUT,
+        *,
+        search_cache: TTLCache = None,
+        parser=None,
+        retry: RetryPolicy = None,
+    ):
+        self.timeout = timeout
+        self.search_cache = search_cache
+        self.parser = parser or SoupParser()
+        self.retry = retry or RetryPolicy()
+
+    def fetch(self, url):
+        attempt = 0
+        while True:
+            try:
+                return requests.get(url, timeout=self.timeout).content
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.retry.retries:
+                    raise
+                logger.debug(f'Retrying "{url}" after {e!r}')
+                time.sleep(self.retry.get_delay(attempt))
+                attempt += 1
+
+    def get_search_url(self, search):
+        return f'{self.BASE_URL}/search?name={quote_plus(search)}'
+
+    def get_cached_search_results(self, query):
+        if self.search_cache is None:
+            return None
+        return self.search_cache.get(query)
+
+    def cache_search_results(self, query, results):
+        if self.search_cache is not None:
+            self.search_cache.set(query, results)
 
     def get_search_results(self, search):
-        logger.debug(f'Getting search results for "{search}"')
-        html = requests.get(f'{self.BASE_URL}/search?name={search}')
-        soup = BeautifulSoup(html.content, 'html.parser')
-        instants = soup.select('.instant')
-        return instants[:25]
+        query = normalize_query(search)
+        logger.debug(f'Getting search results for "{query}"')
+        content = self.fetch(self.get_search_url(query))
+        return self.parse_search_results(content)
 
     def get_single_search_result(self, search):
         results = self.get_search_results(search)
         return results[0] if results else None
 
+    def get_search_records(self, search):
+        """Return the records of the search results, cached by query."""
+        query = normalize_query(search)
+        records = self.get_cached_search_results(query)
+        if records is not None:
+            return records
+
+        results = self.get_search_results(query)
+        records = [self.get_search_record(instant) for instant in results]
+        self.cache_search_results(query, records)
+        return records
+
+    def parse_search_results(self, content):
+        return self.parser.parse_search_results(content, self.MAX_RESULTS)
+
+    def get_search_record(self, instant):
+        """Extract the name and links of a parsed search result.
+
+        A parsed result keeps its whole page alive, so only these plain
+        records are cached. They have the keys of `InstantsIndex` records.
+        """
+        instant_path = self.parser.get_instant_path(instant)
+        mp3_path = self.parser.get_instant_mp3_path(instant)
+        return {
+            # lxml strings reference their element, keep a plain one.
+            'name': str(self.parser.get_instant_name(instant)),
+            'instant_link': f'{self.BASE_URL}{instant_path}',
+            'mp3_link': f'{self.BASE_URL}{mp3_path}',
+        }
+
     def get_instant_name(self, instant):
-        instant_link = instant.select_one('.instant-link')
-        instant_name = instant_link.text
+        instant_name = self.parser.get_instant_name(instant)
         logger.debug(f'Found instant name: "{instant_name}"')
         return instant_name
 
     def get_instant_mp3_link(self, instant):
-        mp3_div = instant.select_one('.small-button')
-        mp3_link = re.search('/media.+.mp3', str(mp3_div)).group(0)
+        mp3_link = self.parser.get_instant_mp3_path(instant)
         full_mp3_link = f'{self.BASE_URL}{mp3_link}'
         logger.debug(f'Found mp3 link: "{full_mp3_link}"')
         return full_mp3_link
 
     def get_instant_link(self, instant):
-        link_attrs = instant.select_one('.instant-link').attrs
-        instant_link = link_attrs['href']
+        instant_link = self.parser.get_instant_path(instant)
         full_instant_link = f'{self.BASE_URL}{instant_link}'
         logger.debug(f'Found instant link: "{full_instant_link}"')
         return full_instant_link
 
     def get_instant_details(self, instant):
-        instant_link = self.get_instant_link(instant)
-        html = requests.get(instant_link)
-        soup = BeautifulSoup(html.content, 'html.parser')
+        return self.fetch_instant_details(self.get_instant_link(instant))
+
+    def fetch_instant_details(self, instant_link):
+        content = self.fetch(instant_link)
+        return self.parse_instant_details(content)
+
+    def parse_instant_details(self, content):
+        soup = self.parser.parse_instant_page(content)
         title = self.get_instant_title(soup)
         description = self.get_instant_description(soup)
         likes = self.get_instant_likes(soup)
@@ -62,46 +148,247 @@ class InstantsCrawler:
 
     def get_instant_title(self, soup):
         try:
-            return soup.select_one('#instant-page-title').text
+            return self.parser.get_instant_title(soup)
         except AttributeError:
             return None
 
     def get_instant_description(self, soup):
         try:
-            return soup.select_one('#instant-page-description').p.text
+            return self.parser.get_instant_description(soup)
         except AttributeError:
             return None
 
     def get_instant_likes(self, soup):
         try:
-            return soup.select_one('#instant-page-likes').b.text
+            return self.parser.get_instant_likes(soup)
         except AttributeError:
             return None
 
     def get_instant_uploader_name(self, soup):
         try:
-            views_div = soup.select_one(
-                '#instant-page-likes'
-            ).nextSibling.nextSibling
-            return views_div.a.text
+            return self.parser.get_instant_uploader_name(soup)
         except AttributeError:
             return 'Anonymous'
 
     def get_instant_uploader_url(self, soup):
         try:
-            views_div = soup.select_one(
-                '#instant-page-likes'
-            ).nextSibling.nextSibling
-            href_attr = views_div.a.attrs.get('href')
+            href_attr = self.parser.get_instant_uploader_path(soup)
             return f'{self.BASE_URL}{href_attr}'
         except AttributeError:
             return None
 
     def get_instant_views(self, soup):
         try:
-            views_div = soup.select_one(
-                '#instant-page-likes'
-            ).nextSibling.nextSibling
-            return re.search(r'[\d,]+ *views', views_div.text).group(0)
+            return self.parser.get_instant_views(soup)
         except AttributeError:
             return None
+
+
+class AsyncInstantsCrawler(InstantsCrawler):
+    """Asyncio-native crawler sharing one keep-alive connection pool.
+
+    Parsing is inherited from `InstantsCrawler`; only the methods that hit
+    the network are coroutines here.
+
+    Every fetch has to complete within `deadline` seconds. Attempts are
+    capped at `attempt_timeout` each and retried with jittered backoff.
+    An attempt still running past the `hedge_percentile` latency of
+    recent requests is hedged with a second identical request, and the
+    first response wins. While the circuit breaker is open, fetches fail
+    fast, and searches fall back to expired cached results if any.
+    """
+
+    CONNECT_TIMEOUT = 3
+    LIMIT = 100
+    LIMIT_PER_HOST = 10
+    KEEPALIVE_TIMEOUT = 30
+    DEADLINE = 8
+    ATTEMPT_TIMEOUT = 3
+    HEDGE_PERCENTILE = 0.95
+
+    def __init__(
+        self,
+        timeout: float = InstantsCrawler.TIMEOUT,
+        *,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        limit: int = LIMIT,
+        limit_per_host: int = LIMIT_PER_HOST,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        session: aiohttp.ClientSession = None,
+        search_cache: TTLCache = None,
+        parser=None,
+        deadline: float = DEADLINE,
+        attempt_timeout: float = ATTEMPT_TIMEOUT,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        retry: RetryPolicy = None,
+        breaker: CircuitBreaker = None,
+    ):
+        super().__init__(
+            timeout, search_cache=search_cache, parser=parser, retry=retry
+        )
+        self.connect_timeout = connect_timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._session = session
+        # Guilds racing on the same query or instant share one fetch.
+        self.inflight = SingleFlight()
+
+        self.retries = 0
+        self.hedges = 0
+        self.stale_results = 0
+
+    @property
+    def stats(self):
+        return {
+            **self.breaker.stats,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'stale_results': self.stale_results,
+        }
+
+    def get_session(self):
+        # The session has to be created from within the running loop, so it
+        # is built lazily on first use and reused by every later request.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=self.connect_timeout
+                ),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(self, url):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f'Not fetching "{url}", circuit open')
+            timeout = min(self.attempt_timeout, deadline - loop.time())
+            try:
+                content = await asyncio.wait_for(
+                    self.fetch_hedged(url), timeout
+                )
+            except Exception as e:
+                if not is_retryable(e):
+                    # Upstream answered, it just has nothing for this url.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self.retry.get_delay(attempt)
+                attempt += 1
+                if (
+                    attempt > self.retry.retries
+                    or loop.time() + delay >= deadline
+                ):
+                    raise
+                logger.debug(f'Retrying "{url}" after {e!r}')
+                self.retries += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return content
+
+    async def fetch_hedged(self, url):
+        """Fetch `url`, racing a second request if the first is slow."""
+        hedge_delay = self.latency.percentile(self.hedge_percentile)
+        pending = {asyncio.ensure_future(self.fetch_once(url))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(self.fetch_once(url)))
+                    hedge_delay = None
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_once(self, url):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        session = self.get_session()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content = await response.read()
+        self.latency.observe(loop.time() - started)
+        return content
+
+    async def get_search_results(self, search):
+        query = normalize_query(search)
+        logger.debug(f'Getting search results for "{query}"')
+        content = await self.fetch(self.get_search_url(query))
+        return self.parse_search_results(content)
+
+    async def get_single_search_result(self, search):
+        results = await self.get_search_results(search)
+        return results[0] if results else None
+
+    async def get_search_records(self, search):
+        query = normalize_query(search)
+        records = self.get_cached_search_results(query)
+        if records is not None:
+            return records
+        return await self.inflight.do(
+            ('search', query), self._get_search_records, query
+        )
+
+    async def _get_search_records(self, query):
+        try:
+            results = await self.get_search_results(query)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            records = (
+                self.search_cache.get_stale(query)
+                if self.search_cache is not None
+                else None
+            )
+            if records is None:
+                raise
+            logger.warning(f'Serving stale results for "{query}": {e!r}')
+            self.stale_results += 1
+            return records
+        records = [self.get_search_record(instant) for instant in results]
+        self.cache_search_results(query, records)
+        return records
+
+    async def get_instant_details(self, instant):
+        return await self.fetch_instant_details(self.get_instant_link(instant))
+
+    async def fetch_instant_details(self, instant_link):
+        return await self.inflight.do(
+            ('details', instant_link),
+            self._fetch_instant_details,
+            instant_link,
+        )
+
+    async def _fetch_instant_details(self, instant_link):
+        content = await self.fetch(instant_link)
+        return self.parse_instant_details(content)
@@ -0,0 +1,28 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """Import module `name`, deferring its execution to first attribute use.
+
+    Keeps heavy dependencies that only some code paths need (HTML parsers,
+    the blocking HTTP client...) off the startup path, while the module
+    can still be referenced, and patched, as a module level name.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,154 @@
+import re
+
+from crawler.lazy import lazy_import
+
+# Parser backends are only loaded once a page is parsed with them.
+bs4 = lazy_import('bs4')
+try:
+    lxml_html = lazy_import('lxml.html')
+    etree = lazy_import('lxml.etree')
+except ModuleNotFoundError:  # pragma: no cover - lxml is an optional speedup
+    lxml_html = None
+
+MP3_PATH = re.compile('/media.+.mp3')
+VIEWS = re.compile(r'[\d,]+ *views')
+
+
+class SoupParser:
+    """BeautifulSoup backend, using the standard library html.parser."""
+
+    name = 'html.parser'
+
+    def parse_search_results(self, content, limit):
+        soup = bs4.BeautifulSoup(content, 'html.parser')
+        return soup.select('.instant', limit=limit)
+
+    def get_instant_name(self, instant):
+        return instant.select_one('.instant-link').text
+
+    def get_instant_mp3_path(self, instant):
+        mp3_div = instant.select_one('.small-button')
+        return MP3_PATH.search(str(mp3_div)).group(0)
+
+    def get_instant_path(self, instant):
+        return instant.select_one('.instant-link').attrs['href']
+
+    def parse_instant_page(self, content):
+        return bs4.BeautifulSoup(content, 'html.parser')
+
+    def get_instant_title(self, page):
+        return page.select_one('#instant-page-title').text
+
+    def get_instant_description(self, page):
+        return page.select_one('#instant-page-description').p.text
+
+    def get_instant_likes(self, page):
+        return page.select_one('#instant-page-likes').b.text
+
+    def get_views_div(self, page):
+        return page.select_one('#instant-page-likes').nextSibling.nextSibling
+
+    def get_instant_uploader_name(self, page):
+        return self.get_views_div(page).a.text
+
+    def get_instant_uploader_path(self, page):
+        return self.get_views_div(page).a.attrs.get('href')
+
+    def get_instant_views(self, page):
+        return VIEWS.search(self.get_views_div(page).text).group(0)
+
+
+class LxmlParser:
+    """lxml backend, stopping the search page parse after `limit` results.
+
+    The search page is fed to an incremental parser in chunks and parsing
+    stops as soon as `limit` `.instant` elements have been closed, so the
+    rest of the page is never tokenized. Elements raise `AttributeError`
+    for missing nodes just like the BeautifulSoup backend, so both can be
+    used interchangeably by `InstantsCrawler`.
+    """
+
+    name = 'lxml'
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self):
+        if lxml_html is None:
+            raise ImportError('The lxml parser backend requires lxml.')
+
+    @staticmethod
+    def has_class(element, name):
+        return name in (element.get('class') or '').split()
+
+    def find_class(self, element, name):
+        for descendant in element.iter():
+            if self.has_class(descendant, name):
+                return descendant
+        return None
+
+    def parse_search_results(self, content, limit):
+        parser = etree.HTMLPullParser(events=('end',), tag='div')
+        parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+
+        instants = []
+        for start in range(0, len(content), self.CHUNK_SIZE):
+            end = start + self.CHUNK_SIZE
+            parser.feed(content[start:end])
+            for _, element in parser.read_events():
+                if self.has_class(element, 'instant'):
+                    instants.append(element)
+                    if limit is not None and len(instants) >= limit:
+                        return instants
+        parser.close()
+        return instants
+
+    def get_instant_name(self, instant):
+        return self.find_class(instant, 'instant-link').text_content()
+
+    def get_instant_mp3_path(self, instant):
+        mp3_div = self.find_class(instant, 'small-button')
+        html = lxml_html.tostring(mp3_div, encoding='unicode')
+        return MP3_PATH.search(html).group(0)
+
+    def get_instant_path(self, instant):
+        return self.find_class(instant, 'instant-link').attrib['href']
+
+    def parse_instant_page(self, content):
+        return lxml_html.document_fromstring(content)
+
+    def get_instant_title(self, page):
+        title = page.get_element_by_id('instant-page-title', None)
+        return title.text_content()
+
+    def get_instant_description(self, page):
+        description = page.get_element_by_id('instant-page-description', None)
+        return description.find('.//p').text_content()
+
+    def get_instant_likes(self, page):
+        likes = page.get_element_by_id('instant-page-likes', None)
+        return likes.find('.//b').text_content()
+
+    def get_views_div(self, page):
+        return page.get_element_by_id('instant-page-likes', None).getnext()
+
+    def get_instant_uploader_name(self, page):
+        return self.get_views_div(page).find('.//a').text_content()
+
+    def get_instant_uploader_path(self, page):
+        return self.get_views_div(page).find('.//a').get('href')
+
+    def get_instant_views(self, page):
+        views_div = self.get_views_div(page)
+        return VIEWS.search(views_div.text_content()).group(0)
+
+
+PARSERS = {parser.name: parser for parser in (SoupParser, LxmlParser)}
+
+
+def get_parser(name: str = None):
+    """Return a parser backend by name, preferring lxml when installed."""
+    if name is None:
+        name = LxmlParser.name if lxml_html is not None else SoupParser.name
+    try:
+        return PARSERS[name]()
+    except KeyError:
+        raise ValueError(f'Unknown parser backend: "{name}"') from None
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import aiohttp
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised without sending a request while upstream is unhealthy."""
+
+
+def is_retryable(error: BaseException):
+    """Whether a failed request may succeed if simply sent again."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter between attempts."""
+
+    RETRIES = 2
+    BASE_DELAY = 0.2
+    MAX_DELAY = 2
+
+    def __init__(
+        self,
+        retries: int = RETRIES,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        *,
+        random=random.random,
+    ):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = random
+
+    def get_delay(self, attempt: int):
+        """Seconds to wait after the `attempt`th failure, from 0."""
+        ceiling = min(self.max_delay, self.base_delay * 2**attempt)
+        return self._random() * ceiling
+
+
+class LatencyTracker:
+    """Latencies of the last `window` successful requests."""
+
+    WINDOW = 200
+    MIN_SAMPLES = 20
+
+    def __init__(self, window: int = WINDOW, min_samples: int = MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float):
+        """Return the `q` quantile, or None until enough requests are seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class CircuitBreaker:
+    """Stops sending requests after `failure_threshold` failures in a row.
+
+    Once open, requests fail fast for `reset_timeout` seconds, after which
+    a single trial request is let through: it closes the circuit if it
+    succeeds, and keeps it open for another `reset_timeout` otherwise.
+    """
+
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 30
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        *,
+        clock=None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock or time.monotonic
+        self.failures = 0
+        self.opened_at = None
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """Whether a request may be sent now."""
+        if self.opened_at is None:
+            return True
+        now = self._clock()
+        if now - self.opened_at >= self.reset_timeout:
+            # Let one trial through, the others wait for its outcome.
+            self.opened_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.is_open or self.failures >= self.failure_threshold:
+            if not self.is_open:
+                self.opened += 1
+            self.opened_at = self._clock()
+
+    @property
+    def stats(self):
+        return {
+            'open': int(self.is_open),
+            'opened': self.opened,
+            'rejected': self.rejected,
+        }
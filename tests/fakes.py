@@ -0,0 +1,101 @@
+"""Discord stand-ins and song factories shared by the test modules."""
+
+from types import SimpleNamespace
+
+from bot.song import Song
+from bot.ytdl import YTDLSource
+
+
+def create_song(name='discord-notification', *, requester_id=42, details=None):
+    """A song for the myinstants sound `name`, as /mi would queue it."""
+    info = YTDLSource.get_direct_media_info(
+        f'https://www.myinstants.com/media/sounds/{name}.mp3'
+    )
+    return Song(info, requester_id=requester_id, details=details)
+
+
+class FakeVoiceClient:
+    def __init__(self, channel):
+        self.channel = channel
+        self.played = []
+
+    def play(self, source, *, after=None):
+        self.played.append(source)
+
+    def is_playing(self):
+        return bool(self.played)
+
+    async def disconnect(self):
+        pass
+
+
+class FakeVoiceChannel:
+    async def connect(self):
+        return FakeVoiceClient(self)
+
+
+class FakeMessage:
+    def __init__(self, content=None):
+        self.content = content
+
+    async def edit(self, **kwargs):
+        self.content = kwargs.get('content', self.content)
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeTextChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+
+    def typing(self):
+        return FakeTyping()
+
+    async def send(self, content=None, **kwargs):
+        return FakeMessage(content)
+
+
+class FakeResponse:
+    """Records the content of the replies sent to an interaction."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def defer(self, **kwargs):
+        pass
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeFollowup:
+    """Records the followups sent, and the messages they became."""
+
+    def __init__(self):
+        self.messages = []
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+        self.sent.append(FakeMessage(content))
+        return self.sent[-1]
+
+
+class FakeInteraction:
+    def __init__(self, guild_id: int, voice_channel: FakeVoiceChannel):
+        self.user = SimpleNamespace(
+            id=guild_id,
+            mention=f'<@{guild_id}>',
+            display_name=f'user-{guild_id}',
+            voice=SimpleNamespace(channel=voice_channel),
+        )
+        self.guild = SimpleNamespace(id=guild_id)
+        self.channel = FakeTextChannel(guild_id)
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+import pytest
+
+from bot.audio_cache import AudioCache
+
+URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        await asyncio.sleep(0)
+        return self.content
+
+
+class FakeSession:
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        return FakeResponse(self.content)
+
+
+@pytest.fixture
+def audio_cache(tmp_path):
+    return AudioCache(str(tmp_path), max_bytes=10)
+
+
+def test_audio_cache_put_and_get(audio_cache):
+    assert audio_cache.get(URL) is None
+
+    path = audio_cache.put(URL, b'mp3')
+    assert audio_cache.get(URL) == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'mp3'
+    assert audio_cache.stats['hits'] == 1
+    assert audio_cache.stats['misses'] == 1
+
+
+def test_audio_cache_evicts_least_recently_used(audio_cache):
+    audio_cache.put('a', b'1234')
+    audio_cache.put('b', b'1234')
+    audio_cache.get('a')
+    audio_cache.put('c', b'1234')
+
+    assert 'a' in audio_cache
+    assert 'b' not in audio_cache
+    assert not os.path.exists(audio_cache.get_path(audio_cache.get_key('b')))
+    assert audio_cache.size == 8
+
+
+def test_audio_cache_rescan(tmp_path):
+    audio_cache = AudioCache(str(tmp_path))
+    audio_cache.put(URL, b'mp3')
+    (tmp_path / 'interrupted.part').write_bytes(b'partial')
+
+    rescanned = AudioCache(str(tmp_path))
+    assert rescanned.get(URL) == audio_cache.get_path(audio_cache.get_key(URL))
+    assert rescanned.size == 3
+    assert not (tmp_path / 'interrupted.part').exists()
+
+
+def test_audio_cache_shares_concurrent_downloads(audio_cache):
+    session = FakeSession(b'mp3')
+
+    async def download():
+        return await asyncio.gather(
+            *(audio_cache.download(URL, session) for _ in range(5))
+        )
+
+    paths = asyncio.run(download())
+    assert len(set(paths)) == 1
+    assert session.requests == [URL]
+    assert audio_cache.get(URL) == paths[0]
@@ -0,0 +1,61 @@
+import pytest
+
+from bot.autocomplete import NameIndex
+
+NAMES = [
+    'Vine Boom',
+    'Bruh',
+    'Sad Trombone',
+    'Discord Notification',
+    'discordjoin',
+    'Vine boom bass boosted',
+]
+
+
+@pytest.fixture
+def names():
+    names = NameIndex()
+    names.update(NAMES)
+    return names
+
+
+def test_name_index_prefix_matches(names):
+    assert names.complete('vine') == ['Vine Boom', 'Vine boom bass boosted']
+    assert names.complete('DISC') == ['Discord Notification', 'discordjoin']
+
+
+def test_name_index_substring_matches(names):
+    assert names.complete('boom') == ['Vine Boom', 'Vine boom bass boosted']
+    assert names.complete('trombone') == ['Sad Trombone']
+    assert names.complete('xyz') == []
+
+
+def test_name_index_empty_query_returns_recent(names):
+    assert names.complete('', limit=2) == [
+        'Vine boom bass boosted',
+        'discordjoin',
+    ]
+
+
+def test_name_index_limit(names):
+    assert names.complete('vine', limit=1) == ['Vine Boom']
+    assert names.complete('boom', limit=1) == ['Vine Boom']
+
+
+def test_name_index_evicts_oldest():
+    names = NameIndex(max_names=2)
+    names.update(['Vine Boom', 'Bruh', 'Vine Boom', 'Sad Trombone'])
+
+    assert len(names) == 2
+    assert 'Bruh' not in names
+    assert names.complete('vine') == ['Vine Boom']
+    assert names.complete('bru') == []
+
+
+def test_name_index_load(tmp_path):
+    path = tmp_path / 'names.txt'
+    path.write_text('Vine Boom\n\nBruh\n', encoding='utf-8')
+
+    names = NameIndex()
+    names.load(str(path))
+    assert len(names) == 2
@@ -0,0 +1,26 @@
+import json
+
+from loguru import logger
+
+from benchmarks.__main__ import compare, main
+
+
+def test_benchmarks_write_comparable_json(tmp_path):
+    output = tmp_path / 'bench.json'
+    results = main(['--iterations', '2', '--output', str(output)])
+
+    names = {result['name'] for result in results['results']}
+    assert 'parse_search_results[html.parser]' in names
+    assert 'mi_enqueue[warm]' in names
+    assert 'mix_second[16]' in names
+    assert json.loads(output.read_text()) == results
+    assert set(compare(results, results).values()) == {0}
+
+
+def test_benchmarks_keep_logging_handlers(tmp_path):
+    handler_id = logger.add(lambda message: None)
+    output = tmp_path / 'bench.json'
+    main(['--suite', 'mixer', '--iterations', '1', '--output', str(output)])
+
+    # Raises ValueError if the handler was removed.
+    logger.remove(handler_id)
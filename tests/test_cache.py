@@ -0,0 +1,112 @@
+from unittest import mock
+
+import pytest
+
+from crawler.cache import TTLCache, normalize_query
+from crawler.instants import InstantsCrawler
+from tests.test_crawler import get_fixture
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.mark.parametrize(
+    'search', ['vine boom', 'Vine%20Boom', 'vine+boom', '  VINE \t boom ']
+)
+def test_normalize_query(search):
+    assert normalize_query(search) == 'vine boom'
+
+
+def test_ttl_cache_hit_and_miss(clock):
+    cache = TTLCache(clock=clock)
+    assert cache.get('bruh') is None
+
+    cache.set('bruh', ['result'])
+    assert cache.get('bruh') == ['result']
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set('bruh', ['result'])
+
+    clock.now = 10
+    assert 'bruh' not in cache
+    assert cache.get('bruh') is None
+    assert cache.stats['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_ttl_cache_keeps_expired_entries_in_grace(clock):
+    cache = TTLCache(ttl=10, grace=5, clock=clock)
+    cache.set('bruh', ['result'])
+
+    clock.now = 12
+    assert cache.get('bruh') is None
+    assert cache.get_stale('bruh') == ['result']
+    clock.now = 15
+    assert cache.get_stale('bruh') is None
+    assert cache.get('bruh') is None
+    assert cache.stats['expirations'] == 1
+    assert cache.stats['stale_hits'] == 1
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(max_entries=2, clock=clock)
+    cache.set('bruh', 1)
+    cache.set('vine boom', 2)
+    cache.get('bruh')
+    cache.set('sad trombone', 3)
+
+    assert 'bruh' in cache
+    assert 'vine boom' not in cache
+    assert cache.stats['evictions'] == 1
+
+
+def test_ttl_cache_snapshot_keeps_time_left(clock):
+    cache = TTLCache(ttl=10, grace=5, clock=clock)
+    cache.set('vine boom', 1)
+    clock.now = 4
+    cache.set('bruh', 2)
+    clock.now = 8
+    snapshot = cache.snapshot()
+
+    restored = TTLCache(ttl=10, grace=5, clock=clock)
+    restored.restore(snapshot, age=4)
+
+    assert 'vine boom' not in restored
+    assert restored.get_stale('vine boom') == 1
+    assert restored.get('bruh') == 2
+    clock.now = 10
+    assert 'bruh' not in restored
+
+    restored = TTLCache(ttl=10, grace=5, clock=clock)
+    restored.restore(snapshot, age=60)
+    assert len(restored) == 0
+
+
+@mock.patch('crawler.instants.requests.get')
+def test_crawler_caches_search_results_by_normalized_query(mock_requests):
+    mock_requests.return_value.content = get_fixture('search_results.html')
+    crawler = InstantsCrawler(search_cache=TTLCache())
+
+    first = crawler.get_search_records('Vine Boom')
+    second = crawler.get_search_records('vine%20boom')
+
+    assert first is second
+    assert first[0]['name'] == 'Discord Notification'
+    mock_requests.assert_called_once_with(
+        'https://www.myinstants.com/search?name=vine+boom', timeout=10
+    )
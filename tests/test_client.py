@@ -0,0 +1,275 @@
+import asyncio
+import functools
+from types import SimpleNamespace
+from unittest import mock
+
+import aiohttp
+import discord
+import pytest
+
+from bot.audio_cache import AudioCache
+from bot.client import InstantClient, VoiceState
+from bot.exceptions import YTDLError
+from bot.mixer import Mixer
+from bot.song import SongQueue
+from tests.fakes import FakeInteraction, FakeVoiceChannel, create_song
+
+MP3_URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+
+
+def create_client(**kwargs):
+    bot = SimpleNamespace(loop=mock.Mock())
+    # Close scheduled coroutines, they are only checked for.
+    bot.loop.create_task.side_effect = lambda coroutine: coroutine.close()
+    return InstantClient(bot, **kwargs)
+
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, opus=False):
+        self.opus = opus
+
+    def read(self):
+        return b''
+
+    def is_opus(self):
+        return self.opus
+
+
+def create_playing_state(source, **kwargs):
+    bot = SimpleNamespace(loop=mock.Mock())
+    bot.loop.create_task.side_effect = lambda coroutine: coroutine.close()
+    voice_state = VoiceState(bot, mock.Mock(), **kwargs)
+    # `VoiceClient.play` only creates an encoder for PCM sources.
+    voice_state.voice = SimpleNamespace(
+        source=source,
+        encoder=mock.Mock() if not source.is_opus() else discord.utils.MISSING,
+        is_playing=lambda: True,
+        is_paused=lambda: False,
+    )
+    return voice_state
+
+
+@mock.patch('discord.opus.Decoder')
+@mock.patch('discord.opus.Encoder')
+def test_overlay_onto_an_opus_source_creates_an_encoder(encoder, decoder):
+    current = FakeSource(opus=True)
+    voice_state = create_playing_state(
+        current, source_factory=mock.AsyncMock(return_value=FakeSource())
+    )
+    client = create_client()
+    song = create_song('bruh')
+
+    assert asyncio.run(client.overlay(voice_state, song))
+
+    assert voice_state.voice.encoder is encoder.return_value
+    assert isinstance(voice_state.voice.source, Mixer)
+    assert len(voice_state.voice.source) == 2
+
+
+def test_overlay_onto_a_pcm_source_keeps_its_encoder():
+    current = FakeSource()
+    voice_state = create_playing_state(current)
+    encoder = voice_state.voice.encoder
+
+    assert voice_state.overlay(FakeSource())
+    assert voice_state.overlay(FakeSource())
+
+    mixer = voice_state.voice.source
+    assert isinstance(mixer, Mixer)
+    assert len(mixer) == 3
+    assert voice_state.voice.encoder is encoder
+
+
+def test_overlay_needs_something_playing():
+    voice_state = create_playing_state(FakeSource())
+    voice_state.voice.is_playing = lambda: False
+
+    assert not voice_state.overlay(FakeSource())
+    assert not asyncio.run(
+        create_client().overlay(voice_state, create_song('bruh'))
+    )
+
+
+def test_enqueue_downloads_into_an_empty_audio_cache(tmp_path):
+    audio_cache = AudioCache(str(tmp_path))
+    assert len(audio_cache) == 0
+    client = create_client(audio_cache=audio_cache)
+    voice_state = SimpleNamespace(
+        songs=SongQueue(), is_playing=False, volume=0.5
+    )
+    song = create_song()
+
+    with mock.patch.object(client, 'cache_audio') as cache_audio:
+        client.enqueue(voice_state, song, MP3_URL)
+
+    cache_audio.assert_called_once_with(MP3_URL)
+    assert list(voice_state.songs) == [song]
+
+
+def run_command(command, argument, resolve_song, *, settle=None, **kwargs):
+    """Run a command with `resolve_song` standing in for the crawler.
+
+    `settle` is awaited before the voice states are closed, to let the
+    background work started by the command finish.
+    """
+
+    async def run():
+        bot = SimpleNamespace(loop=asyncio.get_running_loop())
+        client = InstantClient(bot, **kwargs)
+        client.resolve_song = resolve_song
+        interaction = FakeInteraction(1, FakeVoiceChannel())
+        enqueued = []
+
+        def enqueue(voice_state, song, mp3_link):
+            InstantClient.enqueue(client, voice_state, song, mp3_link)
+            enqueued.append(song)
+
+        with mock.patch.object(client, 'enqueue', side_effect=enqueue):
+            await command.callback(client, interaction, argument)
+        if settle is not None:
+            await settle()
+        for state in list(client.voice_states.values()):
+            await state.close()
+        return interaction, enqueued
+
+    return asyncio.run(run())
+
+
+def run_batch(searches, resolve_song, **kwargs):
+    return run_command(
+        InstantClient.play_batch, searches, resolve_song, **kwargs
+    )
+
+
+def resolve_with_late_details(uploader_name):
+    """Resolve songs whose details arrive after the reply is sent."""
+    details = []
+
+    async def resolve_song(interaction, query):
+        future = asyncio.get_running_loop().create_future()
+        details.append(future)
+        song = create_song(query, details=future)
+        return song, song.url
+
+    async def settle():
+        for future in details:
+            future.set_result({'uploader_name': uploader_name})
+        await asyncio.sleep(0.01)
+
+    return resolve_song, settle
+
+
+@pytest.mark.parametrize(
+    'command, argument',
+    [(InstantClient.play, 'a'), (InstantClient.play_batch, 'a; b')],
+)
+def test_replies_are_updated_with_late_details(command, argument):
+    resolve_song, settle = resolve_with_late_details('Bob')
+
+    interaction, enqueued = run_command(
+        command, argument, resolve_song, settle=settle
+    )
+
+    [reply] = interaction.followup.sent
+    assert 'by **None**' in interaction.followup.messages[0]
+    assert 'by **None**' not in reply.content
+    assert reply.content.count('by **Bob**') == len(enqueued)
+
+
+def test_batch_enqueues_in_the_given_order():
+    songs = {name: create_song(name) for name in 'abc'}
+    resolved = []
+
+    async def resolve_song(interaction, query):
+        # The first sound resolves last.
+        await asyncio.sleep(0.01 * (2 - 'abc'.index(query)))
+        resolved.append(query)
+        return songs[query], songs[query].url
+
+    interaction, enqueued = run_batch('a; b ;c', resolve_song)
+
+    assert resolved == ['c', 'b', 'a']
+    assert enqueued == [songs['a'], songs['b'], songs['c']]
+    assert interaction.followup.messages == [
+        f'`1.` Enqueued {songs["a"]}.\n'
+        f'`2.` Enqueued {songs["b"]}.\n'
+        f'`3.` Enqueued {songs["c"]}.'
+    ]
+
+
+def test_batch_reports_each_failure_in_one_followup():
+    songs = {name: create_song(name) for name in ('a', 'd', 'e')}
+
+    async def resolve_song(interaction, query):
+        if query == 'b':
+            raise YTDLError
+        if query == 'c':
+            raise aiohttp.ClientError
+        return songs[query], songs[query].url
+
+    interaction, enqueued = run_batch(
+        'a; b; c; d; e',
+        resolve_song,
+        queue_factory=functools.partial(SongQueue, 2),
+    )
+
+    assert enqueued == [songs['a'], songs['d']]
+    assert interaction.followup.messages == [
+        f'`1.` Enqueued {songs["a"]}.\n'
+        '`2.` Nothing found for `b`.\n'
+        '`3.` Myinstants did not answer `c`.\n'
+        f'`4.` Enqueued {songs["d"]}.\n'
+        '`5.` The queue is full (2 sounds), wait for some to play.'
+    ]
+
+
+def test_batch_survives_an_unexpected_error():
+    songs = {name: create_song(name) for name in 'ac'}
+
+    async def resolve_song(interaction, query):
+        if query == 'b':
+            raise KeyError('mp3_link')
+        return songs[query], songs[query].url
+
+    interaction, enqueued = run_batch('a; b; c', resolve_song)
+
+    assert enqueued == [songs['a'], songs['c']]
+    assert interaction.followup.messages == [
+        f'`1.` Enqueued {songs["a"]}.\n'
+        '`2.` Could not play `b`.\n'
+        f'`3.` Enqueued {songs["c"]}.'
+    ]
+
+
+def test_batch_limits_concurrent_resolutions():
+    in_flight = []
+    peak = 0
+
+    async def resolve_song(interaction, query):
+        nonlocal peak
+        in_flight.append(query)
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(query)
+        song = create_song(query)
+        return song, song.url
+
+    interaction, enqueued = run_batch('a; b; c; d; e', resolve_song)
+
+    assert len(enqueued) == 5
+    assert peak == InstantClient.BATCH_CONCURRENCY
+
+
+def test_batch_refuses_empty_or_too_many_searches():
+    resolve_song = mock.AsyncMock()
+    too_many = '; '.join('abcdef')
+
+    empty, _ = run_batch(' ; ;', resolve_song)
+    full, _ = run_batch(too_many, resolve_song)
+
+    assert empty.response.messages == ['Separate the sounds to play with ";".']
+    assert full.response.messages == [
+        f'You can play up to {InstantClient.MAX_BATCH} sounds at once.'
+    ]
+    assert empty.followup.messages == full.followup.messages == []
+    resolve_song.assert_not_awaited()
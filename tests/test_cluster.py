@@ -0,0 +1,25 @@
+import pytest
+from discord.ext import commands
+
+from bot.cluster import get_shard_ranges
+from bot.run import create_bot
+
+
+def test_get_shard_ranges():
+    assert get_shard_ranges(4, 2) == [[0, 1], [2, 3]]
+    assert get_shard_ranges(5, 3) == [[0, 1], [2, 3], [4]]
+    assert get_shard_ranges(3, 1) == [[0, 1, 2]]
+
+
+def test_get_shard_ranges_too_many_clusters():
+    with pytest.raises(ValueError):
+        get_shard_ranges(2, 3)
+
+
+def test_create_bot_sharded():
+    bot = create_bot(sharded=True, shard_count=4, shard_ids=[2, 3])
+    assert isinstance(bot, commands.AutoShardedBot)
+    assert bot.shard_count == 4
+    assert bot.shard_ids == [2, 3]
+
+    assert not isinstance(create_bot(), commands.AutoShardedBot)
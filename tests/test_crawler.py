@@ -1,10 +1,13 @@
+import asyncio
 import os
+import sys
 from unittest import mock
 
 import pytest
 from bs4 import BeautifulSoup
 
-from crawler.instants import InstantsCrawler
+from crawler.instants import AsyncInstantsCrawler, InstantsCrawler
+from crawler.lazy import lazy_import
 
 
 def get_fixture(file_name: str) -> dict:
@@ -133,3 +136,77 @@ def test_get_instant_uploader_name(soup_instant_details, instants_crawler):
 def test_get_instant_uploader_url(soup_instant_details, instants_crawler):
     result = instants_crawler.get_instant_uploader_url(soup_instant_details)
     assert result is None
+
+
+@mock.patch('crawler.instants.requests.get')
+def test_instants_crawler_requests_have_timeout(
+    mock_requests, search_results_page
+):
+    mock_requests.return_value.content = search_results_page
+
+    InstantsCrawler(timeout=2.5).get_search_results('discord')
+    mock_requests.assert_called_once_with(
+        'https://www.myinstants.com/search?name=discord', timeout=2.5
+    )
+
+
+def test_async_crawler_get_search_results(search_results_page):
+    crawler = AsyncInstantsCrawler()
+    fetch = mock.AsyncMock(return_value=search_results_page)
+
+    with mock.patch.object(crawler, 'fetch', fetch):
+        results = asyncio.run(crawler.get_search_results('discord'))
+        result = asyncio.run(crawler.get_single_search_result('discord'))
+
+    fetch.assert_called_with('https://www.myinstants.com/search?name=discord')
+    assert len(results) == 25
+    assert crawler.get_instant_name(result) == 'Discord Notification'
+
+
+def test_async_crawler_get_instant_details(
+    instant_result, instant_details_page
+):
+    crawler = AsyncInstantsCrawler()
+    fetch = mock.AsyncMock(return_value=instant_details_page)
+
+    with mock.patch.object(crawler, 'fetch', fetch):
+        details = asyncio.run(crawler.get_instant_details(instant_result))
+
+    fetch.assert_called_once_with(
+        'https://www.myinstants.com/instant/discord-notification-38119/'
+    )
+    assert details['title'] == 'Discord Notification'
+    assert details['views'] == '660,100 views'
+
+
+def test_async_crawler_shares_one_session():
+    async def sessions():
+        crawler = AsyncInstantsCrawler(limit_per_host=4)
+        first, second = crawler.get_session(), crawler.get_session()
+        limit_per_host = first.connector.limit_per_host
+        await crawler.close()
+        return first, second, limit_per_host
+
+    first, second, limit_per_host = asyncio.run(sessions())
+    assert first is second
+    assert first.closed
+    assert limit_per_host == 4
+
+
+def test_lazy_import_defers_module_execution(tmp_path, monkeypatch):
+    executed = []
+    monkeypatch.setattr(
+        'builtins.lazy_probe_executed', executed, raising=False
+    )
+    (tmp_path / 'lazy_probe.py').write_text(
+        'lazy_probe_executed.append(True)\nVALUE = 1\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'lazy_probe', raising=False)
+
+    module = lazy_import('lazy_probe')
+    assert not executed
+    assert module.VALUE == 1
+    assert executed == [True]
+    assert lazy_import('lazy_probe') is module
+    del sys.modules['lazy_probe']
@@ -0,0 +1,96 @@
+import asyncio
+from unittest import mock
+
+import discord
+
+from bot.ffmpeg import FFmpegScheduler, PendingInput
+from bot.ytdl import YTDLSource
+
+
+def test_scheduler_caps_running_processes():
+    async def run():
+        scheduler = FFmpegScheduler(1)
+        await scheduler.acquire('a')
+        waiter = asyncio.ensure_future(scheduler.acquire('a'))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert scheduler.stats['waiting'] == 1
+
+        scheduler.release()
+        await waiter
+        assert scheduler.running == 1
+        scheduler.release()
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+
+def test_scheduler_round_robin_across_guilds():
+    async def run():
+        scheduler = FFmpegScheduler(1)
+        await scheduler.acquire('busy')
+        order = []
+
+        async def play(key, name):
+            await scheduler.acquire(key)
+            order.append(name)
+
+        tasks = [
+            asyncio.ensure_future(play(key, name))
+            for key, name in [('busy', 'b1'), ('busy', 'b2'), ('quiet', 'q1')]
+        ]
+        await asyncio.sleep(0)
+        for _ in tasks:
+            scheduler.release()
+            await asyncio.sleep(0)
+        assert order == ['b1', 'q1', 'b2']
+
+    asyncio.run(run())
+
+
+def test_scheduler_cancelled_waiter():
+    async def run():
+        scheduler = FFmpegScheduler(1)
+        await scheduler.acquire('a')
+        waiter = asyncio.ensure_future(scheduler.acquire('b'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert scheduler.stats['waiting'] == 0
+        scheduler.release()
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+
+def test_pending_input(tmp_path):
+    path = tmp_path / 'sound.mp3'
+    path.write_bytes(b'ID3')
+    pending = PendingInput()
+    pending.attach(str(path))
+    assert pending.read(1024) == b'ID3'
+    assert pending.read(1024) == b''
+
+    closed = PendingInput()
+    closed.close()
+    assert closed.read(1024) == b''
+
+
+@mock.patch('bot.ytdl.discord.FFmpegPCMAudio')
+def test_scheduled_source_releases_on_cleanup(mock_ffmpeg):
+    mock_ffmpeg.return_value = mock.Mock(spec=discord.AudioSource)
+    mock_ffmpeg.return_value.is_opus.return_value = False
+
+    async def run():
+        scheduler = FFmpegScheduler(1)
+        source = await YTDLSource.create_scheduled(
+            'sound.mp3', {}, data={}, key=1, scheduler=scheduler
+        )
+        assert scheduler.running == 1
+        source.cleanup()
+        source.cleanup()
+        await asyncio.sleep(0)
+        return scheduler.running
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,101 @@
+from unittest import mock
+
+import pytest
+
+from crawler.index import Indexer, InstantsIndex, build_match_query
+from crawler.instants import InstantsCrawler
+from crawler.parsers import get_parser
+from tests.test_crawler import get_fixture
+
+DETAILS_LINK = 'https://www.myinstants.com/instant/discord-notification-38119/'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def index():
+    index = InstantsIndex()
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def indexer(index, clock):
+    crawler = InstantsCrawler(parser=get_parser())
+    return Indexer(crawler, index, clock=clock)
+
+
+@pytest.fixture
+def indexed(indexer):
+    indexer.index_page(get_fixture('search_results.html'))
+    return indexer
+
+
+def test_build_match_query():
+    assert build_match_query('Vine%20Boom!') == '"vine"* "boom"*'
+    assert build_match_query('  ') == ''
+
+
+def test_index_page(indexed, index):
+    assert len(index) == 27
+
+    result = index.get_single_search_result('discord notif')
+    assert result['name'] == 'Discord Notification'
+    assert result['instant_link'] == DETAILS_LINK
+    assert result['mp3_link'] == (
+        'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+    )
+    assert index.get_details(result) is None
+
+
+def test_index_search_miss(indexed, index):
+    assert index.get_single_search_result('sad trombone') is None
+    assert index.search('') == []
+    assert index.misses == 1
+
+
+def test_index_page_updates_last_seen(indexed, index, clock):
+    clock.now = 2000.0
+    indexed.index_page(get_fixture('search_results.html'))
+
+    assert len(index) == 27
+    assert index.get_single_search_result('discordjoin')['last_seen'] == 2000
+
+
+def test_refresh_fetches_stale_details(indexed, index, clock):
+    details_page = get_fixture('instant_details.html')
+    with mock.patch.object(
+        indexed.crawler, 'fetch', return_value=details_page
+    ) as mock_fetch:
+        assert indexed.refresh(max_age=60, limit=1) == 1
+        mock_fetch.assert_called_once_with(DETAILS_LINK)
+
+        # Fresh details are not fetched again until they age out.
+        clock.now += 30
+        assert indexed.refresh(max_age=60, limit=100) == 26
+        assert indexed.refresh(max_age=60, limit=100) == 0
+
+    result = index.get_single_search_result('discord notification')
+    assert index.get_details(result)['views'] == '660,100 views'
+
+
+def test_crawl_stops_on_empty_page(indexer):
+    pages = [get_fixture('search_results.html'), b'<html></html>']
+    with mock.patch.object(
+        indexer.crawler, 'fetch', side_effect=pages
+    ) as mock_fetch:
+        total = indexer.crawl(indexer.get_listing_urls(5))
+
+    assert total == 27
+    assert mock_fetch.call_count == 2
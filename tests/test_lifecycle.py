@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from bot.lifecycle import VoiceStateReaper
+
+
+class FakeState:
+    def __init__(self, *, last_active=0, voice=None, songs=(), **kwargs):
+        self.timed_out = False
+        self.is_playing = False
+        self.last_active = last_active
+        self.voice = voice
+        self.songs = list(songs)
+        self.closed = False
+        self.__dict__.update(kwargs)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_reaper_evicts_stale_states():
+    disconnected = mock.Mock()
+    disconnected.is_connected.return_value = False
+    playing = mock.Mock()
+    playing.is_connected.return_value = True
+    playing.is_playing.return_value = True
+    finished = mock.Mock()
+    finished.is_connected.return_value = True
+    finished.is_playing.return_value = False
+
+    states = {
+        1: FakeState(timed_out=True),
+        2: FakeState(voice=disconnected),
+        3: FakeState(last_active=0),
+        4: FakeState(last_active=0, is_playing=True, voice=playing),
+        5: FakeState(last_active=0, songs=[SimpleNamespace(data={})]),
+        6: FakeState(last_active=950),
+        # Played a song, which leaves `current` and so `is_playing` set.
+        7: FakeState(last_active=0, is_playing=True, voice=finished),
+    }
+    closed = dict(states)
+    reaper = VoiceStateReaper(max_idle=100, clock=lambda: 1000)
+
+    assert asyncio.run(reaper.reap(states)) == 4
+    assert sorted(states) == [4, 5, 6]
+    assert all(closed[i].closed for i in (1, 2, 3, 7))
+    assert reaper.stats == {'timed_out': 1, 'disconnected': 1, 'idle': 2}
+
+
+def test_reaper_memory_size():
+    states = {1: FakeState(songs=[SimpleNamespace(data={'title': 'a'})])}
+    size = VoiceStateReaper.get_memory_size(states)
+    assert size > VoiceStateReaper.get_memory_size({1: FakeState()}) > 0
@@ -0,0 +1,90 @@
+import array
+import asyncio
+from unittest import mock
+
+import discord
+
+from bot.loudness import LoudnessMeter, LoudnessStore
+from bot.ytdl import YTDLSource
+from crawler.index import InstantsIndex
+
+MP3_URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+
+
+def get_frame(value):
+    return array.array('h', [value] * 1920).tobytes()
+
+
+def test_meter_skips_silence_and_reports_once():
+    measured = []
+    meter = LoudnessMeter(measured.append)
+    for _ in range(5):
+        meter.add(get_frame(0))
+    for _ in range(LoudnessMeter.MIN_FRAMES):
+        meter.add(get_frame(1000))
+    meter.add(b'')
+    meter.finish()
+
+    assert measured == [1000]
+
+
+def test_meter_ignores_sounds_too_short_to_measure():
+    measured = []
+    meter = LoudnessMeter(measured.append)
+    meter.add(get_frame(1000))
+    meter.finish()
+
+    assert measured == []
+
+
+def test_store_clamps_and_persists_gains():
+    index = InstantsIndex()
+    store = LoudnessStore(index, target_rms=3000)
+
+    assert store.get(MP3_URL) is None
+    assert store.record(MP3_URL, 1500) == 2.0
+    assert store.get_gain(10) == LoudnessStore.MAX_GAIN
+    assert store.get_gain(30000) == LoudnessStore.MIN_GAIN
+    assert index.get_gain(MP3_URL) == 2.0
+
+    # A restarted bot reads it back from the index.
+    assert LoudnessStore(index).get(MP3_URL) == 2.0
+    assert store.stats == {
+        'entries': 1,
+        'hits': 0,
+        'misses': 1,
+        'measured': 1,
+    }
+
+
+@mock.patch('bot.ytdl.discord.FFmpegPCMAudio')
+def test_source_is_measured_once_then_normalized(mock_ffmpeg):
+    frames = [get_frame(1000)] * LoudnessMeter.MIN_FRAMES
+
+    def create_ffmpeg(*args, **kwargs):
+        audio = mock.Mock(spec=discord.AudioSource)
+        audio.is_opus.return_value = False
+        audio.read.side_effect = frames + [b'']
+        return audio
+
+    mock_ffmpeg.side_effect = create_ffmpeg
+    store = LoudnessStore(target_rms=3000)
+    info = YTDLSource.get_direct_media_info(MP3_URL)
+
+    async def play():
+        source = await YTDLSource.from_info(info, loudness=store)
+        source.volume = 1
+        played = list(iter(source.read, b''))
+        source.cleanup()
+        await asyncio.sleep(0)
+        return played
+
+    assert set(asyncio.run(play())) == {get_frame(1000)}
+    assert store.get(MP3_URL) == 3.0
+
+    async def replay():
+        source = await YTDLSource.from_info(info, loudness=store)
+        assert source.meter is None
+        return source.read()
+
+    assert asyncio.run(replay()) == get_frame(1500)
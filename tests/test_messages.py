@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from bot.messages import MessageScheduler, Notice, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMessage:
+    def __init__(self, channel, **kwargs):
+        self.channel = channel
+        self.content = kwargs['content']
+        self.embed = kwargs['embed']
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        if self.channel.deleted:
+            raise discord.NotFound(mock.Mock(status=404), 'Unknown Message')
+        self.content = kwargs['content']
+        self.embed = kwargs['embed']
+        self.edits += 1
+
+
+class FakeChannel:
+    def __init__(self, channel_id=1):
+        self.id = channel_id
+        self.messages = []
+        self.deleted = False
+
+    async def send(self, **kwargs):
+        self.deleted = False
+        message = FakeMessage(self, **kwargs)
+        self.messages.append(message)
+        return message
+
+
+async def settle():
+    while len(asyncio.all_tasks()) > 1:
+        await asyncio.sleep(0)
+
+
+def test_rate_limiter_slides_its_window():
+    clock = FakeClock()
+    limiter = RateLimiter(2, 5, clock=clock)
+
+    async def acquire_twice():
+        await limiter.acquire()
+        clock.now += 1
+        await limiter.acquire()
+
+    asyncio.run(acquire_twice())
+    assert limiter.get_delay() == 4
+    clock.now += 4
+    assert limiter.get_delay() == 0
+
+
+def test_notices_are_merged_into_one_status_message():
+    channel = FakeChannel()
+    scheduler = MessageScheduler()
+    song = SimpleNamespace(title='bruh')
+
+    async def notify():
+        scheduler.now_playing(channel, discord.Embed(title='discord'))
+        scheduler.notify(channel, 'first')
+        scheduler.notify(channel, Notice('Enqueued {0.title}.', song))
+        await settle()
+        song.title = 'Bruh'
+        scheduler.touch(channel)
+        await settle()
+
+    asyncio.run(notify())
+
+    assert len(channel.messages) == 1
+    message = channel.messages[0]
+    assert message.embed.title == 'discord'
+    assert message.content == 'first\nEnqueued Bruh.'
+    assert message.edits == 1
+    assert scheduler.stats['merged'] == 2
+    assert scheduler.stats['sent'] == 1
+    assert scheduler.stats['edited'] == 1
+
+
+def test_notices_over_the_limit_are_dropped():
+    channel = FakeChannel()
+    scheduler = MessageScheduler(max_lines=2)
+
+    async def notify():
+        for line in ('a', 'b', 'c'):
+            scheduler.notify(channel, line)
+        await settle()
+
+    asyncio.run(notify())
+
+    assert channel.messages[0].content == 'b\nc'
+    assert scheduler.stats['dropped'] == 1
+
+
+def test_status_is_sent_again_when_old_or_deleted():
+    clock = FakeClock()
+    channel = FakeChannel()
+    scheduler = MessageScheduler(max_age=60, clock=clock)
+
+    async def notify(line):
+        scheduler.notify(channel, line)
+        await settle()
+
+    asyncio.run(notify('a'))
+    clock.now += 61
+    asyncio.run(notify('b'))
+    channel.deleted = True
+    asyncio.run(notify('c'))
+
+    assert [message.content for message in channel.messages] == [
+        'a',
+        'a\nb',
+        'a\nb\nc',
+    ]
+    assert scheduler.stats['sent'] == 3
+
+
+def test_status_is_dropped_when_the_channel_is_gone():
+    channel = FakeChannel()
+    channel.send = mock.AsyncMock(
+        side_effect=discord.NotFound(mock.Mock(status=404), 'Unknown Channel')
+    )
+    scheduler = MessageScheduler()
+
+    async def notify():
+        scheduler.notify(channel, 'a')
+        await settle()
+
+    asyncio.run(notify())
+
+    assert channel.send.await_count == 1
+    assert scheduler.stats['failed'] == 1
+    assert channel.id not in scheduler._channels
@@ -0,0 +1,97 @@
+import asyncio
+import socket
+
+import aiohttp
+
+from bot.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsServer,
+    Registry,
+)
+
+
+def test_counter_render():
+    counter = Counter('requests_total', 'Requests.', ['outcome'])
+    counter.inc(outcome='enqueued')
+    counter.inc(2, outcome='enqueued')
+
+    assert counter.get(outcome='enqueued') == 3
+    assert counter.render() == [
+        '# HELP requests_total Requests.',
+        '# TYPE requests_total counter',
+        'requests_total{outcome="enqueued"} 3',
+    ]
+
+
+def test_gauge_function():
+    gauge = Gauge('cache_events', 'Events.', ['cache', 'event'])
+    gauge.set_function(lambda: {('search', 'hits'): 4})
+    assert gauge.render()[-1] == 'cache_events{cache="search",event="hits"} 4'
+
+    unlabelled = Gauge('voice_states', 'Voice states.')
+    unlabelled.set_function(lambda: 7)
+    assert unlabelled.render()[-1] == 'voice_states 7'
+
+
+def test_histogram_render():
+    histogram = Histogram('stage_seconds', 'Stages.', ['stage'], [0.1, 1])
+    histogram.observe(0.05, stage='search')
+    histogram.observe(0.5, stage='search')
+    histogram.observe(5, stage='search')
+
+    assert histogram.get_count(stage='search') == 3
+    assert histogram.render()[2:] == [
+        'stage_seconds_bucket{stage="search",le="0.1"} 1',
+        'stage_seconds_bucket{stage="search",le="1"} 2',
+        'stage_seconds_bucket{stage="search",le="+Inf"} 3',
+        'stage_seconds_sum{stage="search"} 5.55',
+        'stage_seconds_count{stage="search"} 3',
+    ]
+
+
+def test_histogram_time():
+    histogram = Histogram('stage_seconds', 'Stages.', ['stage'])
+    with histogram.time(stage='details'):
+        pass
+    assert histogram.get_count(stage='details') == 1
+
+
+def test_registry_const_labels():
+    registry = Registry(cluster='1')
+    counter = registry.register(
+        Counter('requests_total', 'Requests.', ['outcome'])
+    )
+    histogram = registry.register(
+        Histogram('stage_seconds', 'Stages.', buckets=[1])
+    )
+    counter.inc(outcome='enqueued')
+    histogram.observe(0.5)
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{outcome="enqueued",cluster="1"} 1' in lines
+    assert 'stage_seconds_bucket{cluster="1",le="1"} 1' in lines
+    assert 'stage_seconds_count{cluster="1"} 1' in lines
+
+
+def test_metrics_server():
+    registry = Registry()
+    registry.register(Counter('requests_total', 'Requests.')).inc()
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    async def scrape():
+        server = MetricsServer(registry, port=port)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                url = f'http://127.0.0.1:{port}/metrics'
+                async with session.get(url) as response:
+                    return await response.text()
+        finally:
+            await server.stop()
+
+    assert 'requests_total 1' in asyncio.run(scrape())
@@ -0,0 +1,82 @@
+import array
+
+from bot.mixer import FRAME_SIZE, Mixer, mix
+
+
+def get_frame(value, samples=FRAME_SIZE // 2):
+    return array.array('h', [value] * samples).tobytes()
+
+
+def get_samples(frame):
+    return set(array.array('h', frame))
+
+
+class FakeSource:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.cleaned_up = False
+
+    def read(self):
+        return self.frames.pop(0) if self.frames else b''
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def test_mix_sums_and_applies_volume():
+    assert get_samples(mix([(get_frame(1000), 1)])) == {1000}
+    assert get_samples(mix([(get_frame(1000), 0.5)])) == {500}
+    assert get_samples(
+        mix([(get_frame(1000), 1), (get_frame(-300), 1), (get_frame(40), 2)])
+    ) == {780}
+
+
+def test_mix_clips_once_after_summing():
+    loud = get_frame(30000)
+    assert get_samples(mix([(loud, 1), (loud, 1)])) == {32767}
+    assert get_samples(mix([(get_frame(-30000), 1)] * 2)) == {-32768}
+    # Intermediate sums do not saturate.
+    assert get_samples(
+        mix([(loud, 1), (loud, 1), (get_frame(-30000), 1)])
+    ) == {30000}
+
+
+def test_mix_pads_short_frames():
+    frame = mix([(get_frame(100), 1), (get_frame(100, samples=10), 1)])
+
+    assert len(frame) == FRAME_SIZE
+    samples = array.array('h', frame)
+    assert set(samples[:10]) == {200}
+    assert set(samples[10:]) == {100}
+
+
+def test_mixer_drops_finished_tracks():
+    short = FakeSource([get_frame(10)])
+    long = FakeSource([get_frame(20)] * 2)
+    mixer = Mixer()
+    assert mixer.add(short)
+    assert mixer.add(long, volume=0.5)
+
+    assert get_samples(mixer.read()) == {20}
+    assert get_samples(mixer.read()) == {10}
+    assert short.cleaned_up
+    assert len(mixer) == 1
+    assert mixer.read() == b''
+    assert long.cleaned_up
+    assert len(mixer) == 0
+
+
+def test_mixer_refuses_tracks_when_full():
+    mixer = Mixer(max_tracks=1)
+    assert mixer.add(FakeSource([]))
+    assert not mixer.add(FakeSource([]))
+
+    source = FakeSource([get_frame(1)])
+    mixer = Mixer()
+    mixer.add(source)
+    mixer.cleanup()
+    assert source.cleaned_up
+    assert mixer.read() == b''
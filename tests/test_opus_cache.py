@@ -0,0 +1,89 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from bot.ffmpeg import FFmpegScheduler
+from bot.opus_cache import (
+    OpusCache,
+    OpusFrames,
+    OpusFrameSource,
+    pack_frames,
+)
+
+URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+FRAMES = [b'\x01' * 40, b'\x02' * 60, b'\x03' * 20]
+
+
+@pytest.fixture
+def opus_cache(tmp_path):
+    return OpusCache(str(tmp_path), min_plays=2)
+
+
+def test_opus_frames_from_file(tmp_path):
+    path = tmp_path / 'frames.opus'
+    path.write_bytes(pack_frames(FRAMES))
+
+    frames = OpusFrames.from_file(str(path))
+    assert len(frames) == 3
+    assert list(frames) == FRAMES
+
+
+def test_opus_frame_source_replays_frames():
+    source = OpusFrameSource(FRAMES)
+    assert source.is_opus()
+    assert list(iter(source.read, b'')) == FRAMES
+
+
+def test_opus_cache_encodes_after_min_plays(opus_cache):
+    assert not opus_cache.record_play(URL, 0.5)
+    assert opus_cache.record_play(URL, 0.5)
+    assert not opus_cache.record_play(URL, 1.0)
+
+
+def test_opus_cache_encode_and_get(opus_cache, tmp_path):
+    with mock.patch.object(opus_cache, 'read_frames', return_value=FRAMES):
+        asyncio.run(opus_cache.encode('/tmp/sound.mp3', URL, 0.5))
+
+    assert opus_cache.get(URL, 0.5) == FRAMES
+    assert opus_cache.get(URL, 1.0) is None
+    assert not opus_cache.record_play(URL, 0.5)
+
+    # A fresh process only has the disk copy, replayed through mmap.
+    rescanned = OpusCache(str(tmp_path))
+    assert list(rescanned.get(URL, 0.5)) == FRAMES
+
+
+def test_opus_cache_memory_budget(tmp_path):
+    opus_cache = OpusCache(str(tmp_path), memory_bytes=150)
+    opus_cache.remember('a', FRAMES)
+    opus_cache.remember('b', FRAMES)
+
+    assert opus_cache.stats['memory_entries'] == 1
+    assert opus_cache.memory_size == 120
+
+
+def test_opus_cache_encodes_within_the_ffmpeg_cap(opus_cache):
+    scheduler = FFmpegScheduler(1)
+    running = []
+
+    def read_frames(source, volume):
+        running.append(scheduler.running)
+        return FRAMES
+
+    async def encode_while_playing():
+        await scheduler.acquire('guild')
+        encoding = asyncio.ensure_future(
+            opus_cache.encode(URL, URL, 0.5, scheduler=scheduler)
+        )
+        await asyncio.sleep(0.01)
+        assert scheduler.stats['waiting'] == 1
+        scheduler.release()
+        await encoding
+
+    with mock.patch.object(opus_cache, 'read_frames', read_frames):
+        asyncio.run(encode_while_playing())
+
+    assert running == [1]
+    assert scheduler.running == 0
+    assert opus_cache.get(URL, 0.5) == FRAMES
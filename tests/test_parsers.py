@@ -0,0 +1,89 @@
+import pytest
+
+from crawler.instants import InstantsCrawler
+from crawler.parsers import LxmlParser, SoupParser, get_parser
+from tests.test_crawler import get_fixture
+
+
+@pytest.fixture(scope='module')
+def search_results_page():
+    return get_fixture('search_results.html')
+
+
+@pytest.fixture(scope='module')
+def instant_details_page():
+    return get_fixture('instant_details.html')
+
+
+@pytest.fixture(params=[SoupParser, LxmlParser])
+def crawler(request):
+    return InstantsCrawler(parser=request.param())
+
+
+def extract_search_results(crawler, content):
+    return [
+        (
+            crawler.get_instant_name(instant),
+            crawler.get_instant_link(instant),
+            crawler.get_instant_mp3_link(instant),
+        )
+        for instant in crawler.parse_search_results(content)
+    ]
+
+
+def test_parsers_extract_same_search_results(crawler, search_results_page):
+    expected = extract_search_results(InstantsCrawler(), search_results_page)
+    results = extract_search_results(crawler, search_results_page)
+
+    assert len(results) == 25
+    assert results == expected
+    assert results[0] == (
+        'Discord Notification',
+        'https://www.myinstants.com/instant/discord-notification-38119/',
+        'https://www.myinstants.com/media/sounds/discord-notification.mp3',
+    )
+
+
+def test_search_records_hold_plain_strings(crawler, search_results_page):
+    records = [
+        crawler.get_search_record(instant)
+        for instant in crawler.parse_search_results(search_results_page)
+    ]
+
+    assert [
+        (record['name'], record['instant_link'], record['mp3_link'])
+        for record in records
+    ] == extract_search_results(crawler, search_results_page)
+    # Nothing left referencing the parsed page.
+    assert all(
+        type(value) is str for record in records for value in record.values()
+    )
+
+
+def test_parsers_extract_same_instant_details(crawler, instant_details_page):
+    expected = InstantsCrawler().parse_instant_details(instant_details_page)
+    assert crawler.parse_instant_details(instant_details_page) == expected
+
+
+def test_parsers_handle_missing_nodes(crawler):
+    assert crawler.parse_search_results(b'<html></html>') == []
+    assert crawler.parse_instant_details(b'<html></html>') == {
+        'title': None,
+        'description': None,
+        'likes': None,
+        'uploader_name': 'Anonymous',
+        'uploader_url': None,
+        'views': None,
+    }
+
+
+def test_lxml_parser_stops_after_limit(search_results_page):
+    instants = LxmlParser().parse_search_results(search_results_page, 3)
+    assert len(instants) == 3
+
+
+def test_get_parser():
+    assert isinstance(get_parser(), LxmlParser)
+    assert isinstance(get_parser('html.parser'), SoupParser)
+    with pytest.raises(ValueError):
+        get_parser('html5lib')
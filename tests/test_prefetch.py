@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot.prefetch import BufferedSource, Prefetcher
+
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+
+
+class FakeAudio(discord.AudioSource):
+    def __init__(self, frames: int):
+        self.frames = [bytes([i]) * FRAME_SIZE for i in range(frames)]
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return self.frames.pop(0) if self.frames else b''
+
+
+def make_song(frames: int = 10):
+    original = FakeAudio(frames)
+    return SimpleNamespace(
+        source=SimpleNamespace(original=original, url='https://x/y.mp3')
+    )
+
+
+def test_prefetcher_buffers_next_songs():
+    prefetcher = Prefetcher(depth=2, frames=4)
+    songs = [make_song(), make_song(), make_song()]
+
+    async def prefetch():
+        prefetcher.prefetch(songs, loop=asyncio.get_running_loop())
+        await asyncio.gather(
+            *(song.source.original.future for song in songs[:2])
+        )
+        for song in songs:
+            await prefetcher.ready(song)
+
+    asyncio.run(prefetch())
+
+    assert isinstance(songs[0].source.original, BufferedSource)
+    assert songs[0].source.original.buffered_frames == 4
+    assert songs[1].source.original.buffered_frames == 4
+    assert isinstance(songs[2].source.original, FakeAudio)
+    assert prefetcher.buffered_bytes == 8 * FRAME_SIZE
+
+
+def test_buffered_source_keeps_frame_order():
+    prefetcher = Prefetcher(frames=3)
+    original = FakeAudio(5)
+    expected = list(original.frames)
+
+    buffered = BufferedSource(original, prefetcher)
+    buffered.fill(3)
+
+    assert list(iter(buffered.read, b'')) == expected
+    assert prefetcher.buffered_bytes == 0
+
+
+def test_buffered_source_respects_memory_budget():
+    prefetcher = Prefetcher(max_bytes=2 * FRAME_SIZE)
+    buffered = BufferedSource(FakeAudio(10), prefetcher)
+    buffered.fill(5)
+
+    assert buffered.buffered_frames == 2
+    buffered.cleanup()
+    assert prefetcher.buffered_bytes == 0
+
+
+def test_buffered_source_short_sound():
+    prefetcher = Prefetcher()
+    buffered = BufferedSource(FakeAudio(2), prefetcher)
+    buffered.fill(5)
+
+    assert [buffered.read() for _ in range(4)] == [
+        bytes([0]) * FRAME_SIZE,
+        bytes([1]) * FRAME_SIZE,
+        b'',
+        b'',
+    ]
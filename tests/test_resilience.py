@@ -0,0 +1,177 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from crawler.cache import TTLCache
+from crawler.instants import AsyncInstantsCrawler
+from crawler.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryPolicy,
+)
+from tests.test_crawler import get_fixture
+
+
+class FaultyServer:
+    """Local myinstants stub answering with a scripted list of faults.
+
+    Each request pops the next fault: 'ok', 'slow' (answers after half a
+    second), or an HTTP error status. Once the script runs out, every
+    request is answered normally.
+    """
+
+    def __init__(self, *faults):
+        self.faults = list(faults)
+        self.requests = 0
+        self.page = get_fixture('search_results.html')
+
+    async def handle(self, request):
+        self.requests += 1
+        fault = self.faults.pop(0) if self.faults else 'ok'
+        if fault == 'slow':
+            await asyncio.sleep(0.5)
+        elif fault != 'ok':
+            return web.Response(status=fault)
+        return web.Response(body=self.page, content_type='text/html')
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/search', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        host, port = self.runner.addresses[0][:2]
+        return f'http://{host}:{port}'
+
+    async def __aexit__(self, *args):
+        await self.runner.cleanup()
+
+
+def create_crawler(base_url, **kwargs):
+    kwargs.setdefault('retry', RetryPolicy(random=lambda: 0))
+    crawler = AsyncInstantsCrawler(**kwargs)
+    crawler.BASE_URL = base_url
+    return crawler
+
+
+def search(server, crawler, query='discord'):
+    async def run():
+        async with server as base_url:
+            crawler.BASE_URL = base_url
+            try:
+                return await crawler.get_search_records(query)
+            finally:
+                await crawler.close()
+
+    return asyncio.run(run())
+
+
+def test_retry_policy_backs_off_with_jitter():
+    policy = RetryPolicy(base_delay=0.2, max_delay=1, random=lambda: 0.5)
+
+    assert policy.get_delay(0) == 0.1
+    assert policy.get_delay(1) == 0.2
+    assert policy.get_delay(5) == 0.5
+
+
+def test_latency_tracker_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=4)
+    for seconds in (0.3, 0.1, 0.2):
+        tracker.observe(seconds)
+    assert tracker.percentile(0.5) is None
+
+    tracker.observe(0.4)
+    assert tracker.percentile(0.5) == 0.3
+    assert tracker.percentile(1) == 0.4
+
+
+def test_circuit_breaker_opens_and_lets_one_trial_through():
+    now = [0]
+    breaker = CircuitBreaker(2, 30, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.stats == {'open': 0, 'opened': 1, 'rejected': 2}
+
+
+def test_fetch_retries_server_errors():
+    server = FaultyServer(503, 500)
+    crawler = create_crawler(None)
+
+    assert len(search(server, crawler)) == 25
+    assert server.requests == 3
+    assert crawler.stats['retries'] == 2
+
+
+def test_fetch_does_not_retry_client_errors():
+    server = FaultyServer(404)
+    crawler = create_crawler(None)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        search(server, crawler)
+    assert server.requests == 1
+    assert not crawler.breaker.is_open
+
+
+def test_slow_fetch_is_hedged():
+    server = FaultyServer('slow')
+    crawler = create_crawler(None)
+    for _ in range(crawler.latency.min_samples):
+        crawler.latency.observe(0.05)
+
+    async def timed_search():
+        loop = asyncio.get_running_loop()
+        async with server as base_url:
+            crawler.BASE_URL = base_url
+            started = loop.time()
+            results = await crawler.get_search_records('discord')
+            elapsed = loop.time() - started
+            await crawler.close()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(timed_search())
+    assert len(results) == 25
+    assert elapsed < 0.5
+    assert server.requests == 2
+    assert crawler.stats['hedges'] == 1
+
+
+def test_fetch_gives_up_at_its_deadline():
+    server = FaultyServer('slow', 'slow')
+    crawler = create_crawler(None, deadline=0.3, attempt_timeout=0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        search(server, crawler)
+    assert crawler.stats['retries'] == 1
+
+
+def test_open_circuit_fails_fast_or_serves_stale_results():
+    now = [0]
+    cache = TTLCache(ttl=10, grace=60, clock=lambda: now[0])
+    crawler = create_crawler(
+        None,
+        search_cache=cache,
+        retry=RetryPolicy(retries=0),
+        breaker=CircuitBreaker(1, 30, clock=lambda: now[0]),
+    )
+    assert len(search(FaultyServer(), crawler)) == 25
+
+    now[0] = 20
+    server = FaultyServer(500)
+    assert len(search(server, crawler, 'Discord')) == 25
+    assert crawler.breaker.is_open
+    assert crawler.stats['stale_results'] == 1
+
+    with pytest.raises(CircuitOpenError):
+        search(server, crawler, 'bruh')
+    assert server.requests == 1
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import signal
+
+import discord
+from discord.ext import commands
+
+from bot.run import install_signal_handlers
+
+
+class ShutdownCog(commands.Cog):
+    def __init__(self):
+        self.unloaded = asyncio.Event()
+
+    async def cog_unload(self):
+        self.unloaded.set()
+
+
+def test_sigterm_closes_the_bot_and_unloads_its_cogs():
+    async def terminate():
+        bot = commands.Bot(
+            command_prefix='>', intents=discord.Intents.none()
+        )
+        cog = ShutdownCog()
+        await bot.add_cog(cog)
+        install_signal_handlers(bot)
+
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(cog.unloaded.wait(), 1)
+        while not bot.is_closed():
+            await asyncio.sleep(0.01)
+        return bot
+
+    assert asyncio.run(terminate()).is_closed()
@@ -0,0 +1,99 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from crawler.instants import AsyncInstantsCrawler
+from crawler.singleflight import SingleFlight
+from tests.test_crawler import get_fixture
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do('bruh', fetch, 'bruh') for _ in range(5))
+        )
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ['BRUH'] * 5
+    assert calls == ['bruh']
+    assert flight.stats == {'calls': 1, 'deduplicated': 4, 'in_flight': 0}
+
+
+def test_single_flight_propagates_errors_to_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise asyncio.TimeoutError
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            *(flight.do('bruh', fail) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert len(results) == 3
+    assert all(isinstance(e, asyncio.TimeoutError) for e in results)
+
+
+def test_single_flight_survives_cancelled_waiter():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return 'done'
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do('bruh', fetch))
+        second = asyncio.ensure_future(flight.do('bruh', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 'done'
+
+
+def test_single_flight_runs_again_after_completion():
+    fetch = mock.AsyncMock(return_value='done')
+
+    async def run():
+        flight = SingleFlight()
+        await flight.do('bruh', fetch)
+        await flight.do('bruh', fetch)
+        return flight
+
+    flight = asyncio.run(run())
+    assert fetch.await_count == 2
+    assert flight.deduplicated == 0
+
+
+@pytest.mark.parametrize('search', ['Vine Boom', 'vine%20boom'])
+def test_async_crawler_coalesces_identical_searches(search):
+    content = get_fixture('search_results.html')
+
+    async def fetch(url):
+        await asyncio.sleep(0.01)
+        return content
+
+    async def run():
+        crawler = AsyncInstantsCrawler()
+        with mock.patch.object(crawler, 'fetch', side_effect=fetch) as fake:
+            results = await asyncio.gather(
+                crawler.get_search_records('vine boom'),
+                crawler.get_search_records(search),
+            )
+        return crawler, fake, results
+
+    crawler, fake, results = asyncio.run(run())
+    assert fake.call_count == 1
+    assert results[0] is results[1]
+    assert crawler.inflight.deduplicated == 1
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+from bot.autocomplete import NameIndex
+from bot.opus_cache import OpusCache
+from bot.snapshot import Snapshotter
+from bot.song import Song
+from crawler.cache import TTLCache
+
+RECORD = {
+    'name': 'Bruh',
+    'instant_link': 'https://x/instant/bruh/',
+    'mp3_link': 'https://x/bruh.mp3',
+}
+GUILD = {
+    'voice_channel_id': 10,
+    'text_channel_id': 20,
+    'volume': 0.8,
+    'songs': [
+        {'info': {'title': 'Discord Notification'}, 'requester_id': 42},
+    ],
+}
+
+
+def make_client(tmp_path):
+    names = NameIndex()
+    names.update(['Bruh', 'Discord Notification'])
+    opus_cache = OpusCache(str(tmp_path / 'opus'))
+    opus_cache.record_play('https://x/bruh.mp3', 0.5)
+    search_cache = TTLCache()
+    search_cache.set('bruh', [RECORD])
+    return SimpleNamespace(
+        voice_states={1: SimpleNamespace(snapshot=lambda: GUILD)},
+        pending_restores={2: GUILD},
+        names=names,
+        opus_cache=opus_cache,
+        crawler=SimpleNamespace(search_cache=search_cache),
+    )
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshotter = Snapshotter(str(tmp_path / 'snapshot.json'))
+    snapshotter.save(make_client(tmp_path))
+
+    snapshot = snapshotter.load()
+    assert snapshot['guilds'] == {'1': GUILD, '2': GUILD}
+    assert snapshot['names'] == ['Bruh', 'Discord Notification']
+
+    names = NameIndex()
+    names.restore(snapshot['names'])
+    assert names.complete('bru') == ['Bruh']
+
+    opus_cache = OpusCache(str(tmp_path / 'opus'), min_plays=2)
+    opus_cache.restore(snapshot['opus_plays'])
+    assert opus_cache.record_play('https://x/bruh.mp3', 0.5)
+
+    search_cache = TTLCache()
+    search_cache.restore(snapshot['search_results'])
+    assert search_cache.get('bruh') == [RECORD]
+
+
+def test_snapshot_load_missing_or_corrupt(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    snapshotter = Snapshotter(str(path))
+    assert snapshotter.load() is None
+
+    path.write_text('{"version": 1, "guil')
+    assert snapshotter.load() is None
+
+    path.write_text('{"version": 0}')
+    assert snapshotter.load() is None
+
+
+def test_song_snapshot_round_trip():
+    song = Song({'title': 'Bruh', 'likes': '3'}, requester_id=42)
+    restored = Song.restore(song.snapshot())
+    assert restored.title == 'Bruh'
+    assert restored.likes == '3'
+    assert restored.requester_id == 42
+    assert not restored.has_pending_details
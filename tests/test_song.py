@@ -0,0 +1,135 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from bot.exceptions import QueueFull
+from bot.song import SongQueue
+from tests.fakes import create_song
+
+MP3_URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+
+
+def test_song_merges_late_details():
+    async def play():
+        details = asyncio.get_running_loop().create_future()
+        song = create_song(details=details)
+        assert song.has_pending_details
+
+        details.set_result({'title': 'Discord Notification'})
+        assert await song.wait_for_details()
+        return song
+
+    song = asyncio.run(play())
+    assert not song.has_pending_details
+    assert song.title == 'Discord Notification'
+    assert song.url == MP3_URL
+    assert song.requester_mention == '<@42>'
+
+
+def test_song_ignores_failed_details():
+    async def play():
+        details = asyncio.get_running_loop().create_future()
+        song = create_song(details=details)
+        details.set_exception(asyncio.TimeoutError())
+        return song, await song.wait_for_details()
+
+    song, merged = asyncio.run(play())
+    assert not merged
+    assert song.title == 'discord-notification'
+
+
+def test_song_without_details():
+    song = create_song()
+    assert not song.has_pending_details
+    assert not asyncio.run(song.wait_for_details())
+
+
+def test_song_creates_its_source_once():
+    source = mock.Mock()
+    factory = mock.AsyncMock(return_value=source)
+
+    async def play():
+        song = create_song()
+        assert song.source is None
+        first, second = await asyncio.gather(
+            song.ensure_source(factory), song.ensure_source(factory)
+        )
+        assert first is second is source
+        return song
+
+    song = asyncio.run(play())
+    factory.assert_awaited_once_with(song)
+    assert song.source is source
+
+
+def test_song_merges_details_into_its_source():
+    async def play():
+        details = asyncio.get_running_loop().create_future()
+        song = create_song(details=details)
+        await song.ensure_source(mock.AsyncMock(return_value=mock.Mock()))
+        details.set_result({'likes': '3'})
+        await song.wait_for_details()
+        return song
+
+    song = asyncio.run(play())
+    song.source.update_details.assert_called_once_with({'likes': '3'})
+
+
+def titles(queue):
+    return [song.title for song in queue]
+
+
+def test_queue_fifo_positional_operations():
+    queue = SongQueue()
+    for name in 'abcd':
+        queue.put_nowait(create_song(name, requester_id=1))
+
+    assert titles(queue[1:3]) == ['b', 'c']
+    assert queue.remove(1).title == 'b'
+    queue.move(2, 0)
+    assert titles(queue) == ['d', 'a', 'c']
+
+    queue.put_nowait(create_song('e', requester_id=2))
+    assert titles(queue) == ['d', 'a', 'c', 'e']
+    assert queue.get_nowait().title == 'd'
+    assert queue.count(1) == 2
+
+
+def test_queue_caps():
+    queue = SongQueue(max_size=3, max_per_user=2)
+    queue.put_nowait(create_song('a', requester_id=1))
+    queue.put_nowait(create_song('b', requester_id=1))
+    with pytest.raises(QueueFull):
+        queue.put_nowait(create_song('c', requester_id=1))
+
+    queue.put_nowait(create_song('c', requester_id=2))
+    with pytest.raises(QueueFull):
+        queue.check_capacity(3)
+    assert len(queue) == 3
+
+
+def test_queue_round_robin():
+    queue = SongQueue(round_robin=True)
+    for name in ('a1', 'a2', 'a3'):
+        queue.put_nowait(create_song(name, requester_id=1))
+    queue.put_nowait(create_song('b1', requester_id=2))
+    queue.put_nowait(create_song('b2', requester_id=2))
+    assert titles(queue) == ['a1', 'b1', 'a2', 'b2', 'a3']
+
+    queue.get_nowait()
+    queue.get_nowait()
+    queue.put_nowait(create_song('c1', requester_id=3))
+    assert titles(queue) == ['a2', 'b2', 'c1', 'a3']
+
+
+def test_queue_get_waits_for_put():
+    async def play():
+        queue = SongQueue()
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        queue.put_nowait(create_song('a', requester_id=1))
+        return await getter
+
+    assert asyncio.run(play()).title == 'a'
@@ -0,0 +1,81 @@
+import asyncio
+from unittest import mock
+
+import discord
+from discord import app_commands
+
+from bot.startup import CommandSync, StartupTimer, get_command_fingerprint
+
+
+def create_tree(*names):
+    client = discord.Client(intents=discord.Intents.none())
+    tree = app_commands.CommandTree(client)
+    for name in names:
+
+        async def callback(interaction: discord.Interaction, search: str):
+            pass
+
+        tree.add_command(
+            app_commands.Command(
+                name=name, description=f'{name} command', callback=callback
+            )
+        )
+    tree.sync = mock.AsyncMock(return_value=[])
+    return tree
+
+
+def test_fingerprint_only_changes_with_definitions():
+    fingerprint = get_command_fingerprint(create_tree('mi', 'skip'), 1)
+
+    assert get_command_fingerprint(create_tree('skip', 'mi'), 1) == (
+        fingerprint
+    )
+    assert get_command_fingerprint(create_tree('mi'), 1) != fingerprint
+    assert get_command_fingerprint(create_tree('mi', 'skip'), 2) != (
+        fingerprint
+    )
+
+
+def test_fingerprint_supports_commands_serialized_without_the_tree():
+    # Before discord.py 2.4, `to_dict` took no arguments.
+    class OldCommand:
+        def __init__(self, command):
+            self.command = command
+
+        def to_dict(self):
+            return self.command.to_dict(tree)
+
+    tree = create_tree('mi', 'skip')
+    old_tree = mock.Mock()
+    old_tree.get_commands.return_value = [
+        OldCommand(command) for command in tree.get_commands()
+    ]
+
+    assert get_command_fingerprint(old_tree, 1) == (
+        get_command_fingerprint(tree, 1)
+    )
+
+
+def test_command_sync_skips_unchanged_commands(tmp_path):
+    command_sync = CommandSync(str(tmp_path / 'cache' / 'commands.sha256'))
+    tree = create_tree('mi')
+
+    assert asyncio.run(command_sync.sync(tree, 1))
+    assert not asyncio.run(command_sync.sync(create_tree('mi'), 1))
+    changed = create_tree('mi', 'skip')
+    assert asyncio.run(command_sync.sync(changed, 1))
+    tree.sync.assert_awaited_once()
+    changed.sync.assert_awaited_once()
+
+
+def test_startup_timer_records_phases():
+    now = [10.0]
+    timer = StartupTimer(clock=lambda: now[0])
+    now[0] = 11.5
+    timer.mark('setup')
+    now[0] = 12.0
+    timer.mark('connect')
+
+    assert list(timer.phases) == ['imports', 'setup', 'connect']
+    assert timer.phases['setup'] == 1.5
+    assert timer.phases['connect'] == 0.5
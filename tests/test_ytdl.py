@@ -0,0 +1,45 @@
+import asyncio
+from unittest import mock
+
+import discord
+import pytest
+
+from bot.ytdl import YTDLSource, is_direct_media_url
+
+MP3_URL = 'https://www.myinstants.com/media/sounds/discord-notification.mp3'
+
+
+@pytest.mark.parametrize(
+    'url, expected',
+    [
+        (MP3_URL, True),
+        ('https://example.com/sound.MP3?download=1', True),
+        ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', False),
+        ('https://www.myinstants.com/instant/discord-notification/', False),
+    ],
+)
+def test_is_direct_media_url(url, expected):
+    assert is_direct_media_url(url) is expected
+
+
+def test_get_direct_media_info():
+    info = YTDLSource.get_direct_media_info(MP3_URL)
+    assert info['title'] == 'discord-notification'
+    assert info['webpage_url'] == MP3_URL
+    assert info['ext'] == 'mp3'
+
+
+@mock.patch('bot.ytdl.discord.FFmpegPCMAudio')
+def test_from_url_skips_youtube_dl_for_direct_media(mock_ffmpeg):
+    mock_ffmpeg.return_value = mock.Mock(spec=discord.AudioSource)
+    mock_ffmpeg.return_value.is_opus.return_value = False
+
+    with mock.patch.object(YTDLSource, 'get_ytdl') as mock_get_ytdl:
+        source = asyncio.run(
+            YTDLSource.from_url(MP3_URL, {'title': 'Discord Notification'})
+        )
+
+    mock_get_ytdl.assert_not_called()
+    assert mock_ffmpeg.call_args.args == (MP3_URL,)
+    assert source.title == 'Discord Notification'
+    assert source.url == MP3_URL